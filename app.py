@@ -2,22 +2,24 @@ import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+import anyio.to_thread
 import pytz
 
-from models.database import init_db, get_db_session
+from models.database import init_db, get_db_session, warm_pool
 from routes.dashboard import router as dashboard_router
 from routes.review import router as review_router
-from routes.feeds import router as feeds_router
+from routes.feeds import router as feeds_router, warmup_statements as feeds_warmup_statements
 from routes.feeds_manage import router as feeds_manage_router
-from routes.api import router as api_router
+from routes.api import router as api_router, warmup_statements as api_warmup_statements
 from services.scheduler import ProcessingService
+from templating import warm_templates
 
 # Configure logging
 logging.basicConfig(
@@ -34,10 +36,19 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Eratosthenes RSS aggregator...")
     
+    # Allow more concurrent worker threads for blocking calls offloaded from the loop
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 100
+    
     # Initialize database
     await init_db()
     logger.info("Database initialized")
     
+    # Open pooled connections and prepare the hot queries before serving traffic
+    await warm_pool([*api_warmup_statements(), *feeds_warmup_statements()])
+    
+    # Load review.html and the other pages into Jinja's cache
+    warm_templates()
+    
     # Start scheduler for daily processing
     nz_tz = pytz.timezone('Pacific/Auckland')
     scheduler.add_job(
@@ -60,12 +71,12 @@ app = FastAPI(
     title="Eratosthenes",
     description="RSS feed aggregator and intelligent filter for SOC analysts",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Mount static files and templates
+# Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
 
 # Include routers
 app.include_router(dashboard_router)
@@ -74,15 +85,25 @@ app.include_router(feeds_router)
 app.include_router(feeds_manage_router)
 app.include_router(api_router, prefix="/api")
 
+# Pre-rendered health payload; only the timestamp changes per probe
+_HEALTH_TEMPLATE = '{"status":"healthy","timestamp":"%s","version":"1.0.0"}'
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Render deployment."""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "version": "1.0.0"
-    }
+    return Response(
+        content=_HEALTH_TEMPLATE % datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        media_type="application/json"
+    )
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
+    # uvloop and httptools ship with uvicorn[standard]; auto-reload is for development only
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        reload=os.getenv("ENVIRONMENT") == "development"
+    )
@@ -11,14 +11,18 @@ security = HTTPBasic()
 USERNAME = "eratosthenes"
 PASSWORD = "eratosthenes"
 
+# Encoded once so each request only encodes the submitted credentials
+_USERNAME_BYTES = USERNAME.encode("utf8")
+_PASSWORD_BYTES = PASSWORD.encode("utf8")
+
 
 def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
     """Verify basic auth credentials."""
     is_correct_username = secrets.compare_digest(
-        credentials.username.encode("utf8"), USERNAME.encode("utf8")
+        credentials.username.encode("utf8"), _USERNAME_BYTES
     )
     is_correct_password = secrets.compare_digest(
-        credentials.password.encode("utf8"), PASSWORD.encode("utf8")
+        credentials.password.encode("utf8"), _PASSWORD_BYTES
     )
 
     if not (is_correct_username and is_correct_password):
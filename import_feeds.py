@@ -7,33 +7,18 @@ Usage:
 """
 import asyncio
 import argparse
-import xml.etree.ElementTree as ET
 import os
 import sys
 from sqlalchemy import select
-from models.database import async_session_maker
+from models.database import async_session_maker, dialect_insert
 from models.feed_source import FeedSource
+from services import opml_parser
 
 
 async def parse_opml(opml_file):
     """Parse OPML file and extract feed URLs and names."""
-    feeds = []
-    
-    tree = ET.parse(opml_file)
-    root = tree.getroot()
-    
-    # Find all outline elements that have xmlUrl attribute (actual feeds)
-    for outline in root.findall('.//outline[@xmlUrl]'):
-        feed_url = outline.get('xmlUrl')
-        name = outline.get('title') or outline.get('text')
-        
-        if feed_url and name:
-            feeds.append({
-                'feed_url': feed_url,
-                'name': name
-            })
-    
-    return feeds
+    # File I/O and parsing are blocking; keep them off the event loop
+    return await asyncio.to_thread(opml_parser.parse_opml, opml_file)
 
 
 async def import_feeds(opml_file):
@@ -44,34 +29,31 @@ async def import_feeds(opml_file):
     feeds = await parse_opml(opml_file)
     print(f"✅ Found {len(feeds)} feeds in OPML file")
     
-    # Import into database
-    async with async_session_maker() as session:
-        imported_count = 0
-        skipped_count = 0
-        
-        for feed_data in feeds:
-            # Check if feed already exists
-            result = await session.execute(
-                select(FeedSource).where(FeedSource.feed_url == feed_data['feed_url'])
+    # Import into database with a single INSERT ... ON CONFLICT DO NOTHING
+    imported_urls = set()
+    if feeds:
+        async with async_session_maker() as session:
+            stmt = (
+                dialect_insert(session, FeedSource)
+                .values([
+                    {'feed_url': f['feed_url'], 'name': f['name'], 'enabled': True}
+                    for f in feeds
+                ])
+                .on_conflict_do_nothing(index_elements=['feed_url'])
+                .returning(FeedSource.feed_url)
             )
-            existing_feed = result.scalar_one_or_none()
-            
-            if existing_feed:
-                print(f"⏭️  Skipped (already exists): {feed_data['name']}")
-                skipped_count += 1
-            else:
-                # Create new feed source
-                feed_source = FeedSource(
-                    feed_url=feed_data['feed_url'],
-                    name=feed_data['name'],
-                    enabled=True
-                )
-                session.add(feed_source)
-                print(f"✅ Imported: {feed_data['name']}")
-                imported_count += 1
-        
-        # Commit all changes
-        await session.commit()
+            result = await session.execute(stmt)
+            imported_urls = set(result.scalars().all())
+            await session.commit()
+    
+    for feed_data in feeds:
+        if feed_data['feed_url'] in imported_urls:
+            print(f"✅ Imported: {feed_data['name']}")
+        else:
+            print(f"⏭️  Skipped (already exists): {feed_data['name']}")
+    
+    imported_count = len(imported_urls)
+    skipped_count = len(feeds) - imported_count
     
     print(f"\n📊 Import Summary:")
     print(f"   • Imported: {imported_count} feeds")
@@ -1,8 +1,10 @@
+import asyncio
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,14 +20,53 @@ if DATABASE_URL.startswith("postgres://"):
 elif DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
+# Connection pool sizing (PostgreSQL only). aiosqlite file databases already
+# get a persistent AsyncAdaptedQueuePool from SQLAlchemy, in-memory ones a
+# StaticPool.
+#
+# A processing run only checks out a connection for each short write or
+# read (its progress heartbeats included), so the pool is sized for request
+# traffic (dashboard polling, RSS readers, review) without waiting on
+# connection checkout. All pool_size connections are opened at startup by
+# warm_pool().
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+engine_options = {}
+if DATABASE_URL.startswith("postgresql+asyncpg://"):
+    # Keep connections open between requests rather than reconnecting each
+    # time; pre-ping replaces connections the server has dropped
+    engine_options = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_use_lifo": True,
+        "connect_args": {
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 1024,
+        },
+    }
+
 # Create async engine
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = create_async_engine(DATABASE_URL, echo=False, **engine_options)
+# expire_on_commit=False keeps objects readable after commit without
+# another round-trip to reload them
 async_session_maker = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
 Base = declarative_base()
 
+def dialect_insert(session: AsyncSession, model):
+    """Build an INSERT for ``model`` that supports ON CONFLICT on the session's backend."""
+    if session.bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
 async def get_db_session():
     """Dependency to get database session."""
     async with async_session_maker() as session:
@@ -38,13 +79,45 @@ async def get_db_session():
         finally:
             await session.close()
 
+async def get_readonly_session():
+    """Dependency to get a database session for read-only handlers.
+    
+    Skips the commit/rollback wrapper of get_db_session since nothing is written.
+    """
+    async with async_session_maker() as session:
+        yield session
+
 async def init_db():
     """Initialize database tables."""
     from models.feed_source import FeedSource
     from models.feed_item import FeedItem
     from models.processing_log import ProcessingLog
+    from models.migrations import run_migrations
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all leaves existing tables alone; apply schema changes to them
+        await run_migrations(conn)
     
     logger.info("Database tables initialized")
+
+async def warm_pool(statements=()):
+    """Open the pool's connections up front so the first requests don't pay for it.
+    
+    Each of ``statements`` is run once on every connection, so asyncpg has
+    already prepared the hot queries by the time real traffic arrives.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    
+    connections = await asyncio.gather(*(engine.connect() for _ in range(POOL_SIZE)))
+    try:
+        for stmt in statements:
+            await asyncio.gather(*(conn.execute(stmt) for conn in connections))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in connections))
+    
+    logger.info(
+        f"Connection pool warmed with {POOL_SIZE} connections "
+        f"and {len(statements)} prepared statements"
+    )
@@ -1,17 +1,49 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+import hashlib
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from models.database import Base
 
+_PENDING_REVIEW = text("is_priority_suggestion = true AND priority_feedback IS NULL")
+_RELEVANT = text("is_relevant = true")
+_PRIORITY_APPROVED = text("is_priority_approved = true")
+
+
+def url_hash(url: str) -> bytes:
+    """SHA-256 digest of an item URL, the key items are deduplicated on."""
+    return hashlib.sha256(url.encode()).digest()
+
+
+def _default_url_hash(context):
+    # Single-row inserts only; bulk inserts pass url_hash explicitly
+    return url_hash(context.get_current_parameters()['url'])
+
 class FeedItem(Base):
     __tablename__ = "feed_items"
     
+    # Partial indexes tailored to the hot read paths: the pending-review count,
+    # the review queue pages and the two RSS feeds (newest relevant / approved
+    # items)
+    __table_args__ = (
+        Index('ix_fi_pending', 'id',
+              postgresql_where=_PENDING_REVIEW, sqlite_where=_PENDING_REVIEW),
+        Index('ix_fi_review_queue', text('published_date DESC'), text('id DESC'),
+              postgresql_where=_PENDING_REVIEW, sqlite_where=_PENDING_REVIEW),
+        Index('ix_fi_relevant_pub', 'published_date',
+              postgresql_where=_RELEVANT, sqlite_where=_RELEVANT),
+        Index('ix_fi_priority_pub', 'published_date',
+              postgresql_where=_PRIORITY_APPROVED, sqlite_where=_PRIORITY_APPROVED),
+    )
+    
     id = Column(Integer, primary_key=True)
-    url = Column(Text, unique=True, nullable=False, index=True)
+    url = Column(Text, nullable=False)
+    # Fixed-width dedup key; cheaper to index and compare than the URL itself
+    url_hash = Column(LargeBinary(32), unique=True, nullable=False, default=_default_url_hash)
     title = Column(Text, nullable=False)
     content = Column(Text)
     summary = Column(Text)
-    published_date = Column(DateTime, index=True)
+    published_date = Column(DateTime(timezone=True), index=True)
     source_feed_id = Column(Integer, ForeignKey("feed_sources.id"))
     
     # Processing results
@@ -27,9 +59,9 @@ class FeedItem(Base):
     matched_criteria = Column(Text)  # JSON string of matched criteria
     
     # Metadata
-    processed_at = Column(DateTime)
-    reviewed_at = Column(DateTime)
-    created_at = Column(DateTime, default=func.now())
+    processed_at = Column(DateTime(timezone=True))
+    reviewed_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), default=func.now())
     
     # Relationship
     source_feed = relationship("FeedSource", back_populates="feed_items")
@@ -10,8 +10,11 @@ class FeedSource(Base):
     feed_url = Column(Text, unique=True, nullable=False)
     name = Column(Text, nullable=False)
     enabled = Column(Boolean, default=True)
-    last_fetched = Column(DateTime)
-    created_at = Column(DateTime, default=func.now())
+    last_fetched = Column(DateTime(timezone=True))
+    # Validators from the last successful fetch, sent back as a conditional GET
+    etag = Column(Text)
+    last_modified = Column(Text)
+    created_at = Column(DateTime(timezone=True), default=func.now())
     
     # Relationship
     feed_items = relationship("FeedItem", back_populates="source_feed")
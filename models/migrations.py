@@ -0,0 +1,66 @@
+"""Schema changes for databases created before the current models.
+
+create_all() only creates missing tables, so columns, types and indexes
+added to existing tables are applied here. Every step is idempotent and
+runs from init_db() on each startup.
+"""
+from sqlalchemy import text
+
+from models.database import Base
+
+# Applied in order on PostgreSQL (production); other backends are only used
+# for tests and development and are always created from the current models
+POSTGRES_MIGRATIONS = (
+    # Conditional GET validators on feed sources
+    "ALTER TABLE feed_sources ADD COLUMN IF NOT EXISTS etag TEXT",
+    "ALTER TABLE feed_sources ADD COLUMN IF NOT EXISTS last_modified TEXT",
+
+    # Items are deduplicated on the SHA-256 of their URL (models.feed_item.url_hash)
+    # rather than on the URL itself. Stored URLs are hashed as they are, not
+    # normalized like newly fetched ones (FeedFetcher._normalize_url), so an
+    # old item stored with tracking parameters won't match its clean URL
+    "ALTER TABLE feed_items ADD COLUMN IF NOT EXISTS url_hash BYTEA",
+    "UPDATE feed_items SET url_hash = sha256(convert_to(url, 'UTF8')) WHERE url_hash IS NULL",
+    "ALTER TABLE feed_items ALTER COLUMN url_hash SET NOT NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS feed_items_url_hash_key ON feed_items (url_hash)",
+    "DROP INDEX IF EXISTS ix_feed_items_url",
+
+    # Timestamps are timezone-aware; existing naive values were stored as UTC
+    """
+    DO $$
+    DECLARE col record;
+    BEGIN
+        FOR col IN
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = current_schema()
+              AND table_name IN ('feed_items', 'feed_sources', 'processing_logs')
+              AND data_type = 'timestamp without time zone'
+        LOOP
+            EXECUTE format(
+                'ALTER TABLE %I ALTER COLUMN %I TYPE timestamptz USING %I AT TIME ZONE ''UTC''',
+                col.table_name, col.column_name, col.column_name
+            );
+        END LOOP;
+    END $$
+    """,
+)
+
+
+def _create_missing_indexes(sync_conn):
+    """Create model indexes (e.g. the partial indexes) that don't exist yet."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+async def run_migrations(conn):
+    """Bring existing tables up to date with the models.
+
+    Args:
+        conn: AsyncConnection inside a transaction, after create_all()
+    """
+    if conn.dialect.name == "postgresql":
+        for statement in POSTGRES_MIGRATIONS:
+            await conn.execute(text(statement))
+
+    await conn.run_sync(_create_missing_indexes)
@@ -12,8 +12,8 @@ class ProcessingLog(Base):
     items_relevant = Column(Integer)
     items_priority_suggested = Column(Integer)
     api_calls_made = Column(Integer)
-    started_at = Column(DateTime)
-    completed_at = Column(DateTime)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
     status = Column(String(20))  # 'success', 'failed', 'running'
     error_message = Column(String(500))
     
@@ -1,113 +1,183 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy import select, func
-from datetime import datetime
-import xml.etree.ElementTree as ET
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import json
+import logging
 import os
 
-from models.database import async_session_maker
+from models.database import async_session_maker, dialect_insert, get_db_session, get_readonly_session
 from models.feed_item import FeedItem
 from models.feed_source import FeedSource
 from models.processing_log import ProcessingLog
+from services.clock import today_utc
+from services.opml_parser import parse_opml
 from auth import verify_credentials
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Dashboards poll /stats, so keep the computed payload (and its ETag) for a
+# few seconds rather than re-running the aggregate queries on every hit
+STATS_CACHE_TTL = 10
+_stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL)
+_stats_lock = asyncio.Lock()
+
+# OPML imports larger than this are loaded with COPY on PostgreSQL
+COPY_IMPORT_THRESHOLD = 100
+
+
+TODAY_LOG_FIELDS = (
+    "feeds_processed",
+    "items_fetched",
+    "items_relevant",
+    "items_priority_suggested",
+    "api_calls_made",
+)
+
+
+def _stats_query(today):
+    """Build the stats query for the given UTC date.
+    
+    Everything is fetched as scalar subqueries of a single SELECT, so the
+    database is hit with one round-trip.
+    """
+    def today_log_field(name):
+        column = getattr(ProcessingLog, name)
+        subquery = select(column).where(ProcessingLog.run_date == today).scalar_subquery()
+        return func.coalesce(subquery, 0).label(name)
+    
+    pending_count = (
+        select(func.count()).select_from(FeedItem).where(
+            FeedItem.is_priority_suggestion == True,
+            FeedItem.priority_feedback == None
+        ).scalar_subquery().label("pending_review")
+    )
+    # Total training examples (approved or rejected)
+    training_count = (
+        select(func.count()).select_from(FeedItem).where(
+            FeedItem.priority_feedback != None
+        ).scalar_subquery().label("total_training_examples")
+    )
+    
+    return select(
+        *(today_log_field(name) for name in TODAY_LOG_FIELDS),
+        pending_count,
+        training_count
+    )
+
+
+def warmup_statements():
+    """Stats query to prepare on pooled connections at startup."""
+    return [_stats_query(date(1970, 1, 1))]
+
+
+async def _compute_stats(today):
+    """Run the stats query for the given UTC date."""
+    async with async_session_maker() as session:
+        result = await session.execute(_stats_query(today))
+        row = result.mappings().one()
+    
+    return {
+        "today": {name: row[name] for name in TODAY_LOG_FIELDS},
+        "pending_review": row["pending_review"],
+        "total_training_examples": row["total_training_examples"]
+    }
+
+
 @router.get("/stats")
-async def get_stats(username: str = Depends(verify_credentials)):
+async def get_stats(request: Request, username: str = Depends(verify_credentials)):
     """JSON endpoint for processing statistics."""
-    async with async_session_maker() as session:
-        # Get today's date
-        today = datetime.utcnow().date()
-        
-        # Get today's processing log
-        result = await session.execute(
-            select(ProcessingLog).where(ProcessingLog.run_date == today)
-        )
-        today_log = result.scalar_one_or_none()
-        
-        # Get pending review count
-        result = await session.execute(
-            select(func.count()).select_from(FeedItem).where(
-                FeedItem.is_priority_suggestion == True,
-                FeedItem.priority_feedback == None
-            )
-        )
-        pending_count = result.scalar()
-        
-        # Get total training examples (approved or rejected)
-        result = await session.execute(
-            select(func.count()).select_from(FeedItem).where(
-                FeedItem.priority_feedback != None
-            )
-        )
-        training_count = result.scalar()
-        
-        stats = {
-            "today": {
-                "feeds_processed": today_log.feeds_processed if today_log else 0,
-                "items_fetched": today_log.items_fetched if today_log else 0,
-                "items_relevant": today_log.items_relevant if today_log else 0,
-                "items_priority_suggested": today_log.items_priority_suggested if today_log else 0,
-                "api_calls_made": today_log.api_calls_made if today_log else 0
-            },
-            "pending_review": pending_count,
-            "total_training_examples": training_count
-        }
-        
-        return stats
+    # Get today's date
+    today = today_utc()
+    
+    async with _stats_lock:
+        cached = _stats_cache.get(today)
+        if cached is None:
+            stats = await _compute_stats(today)
+            etag = '"%s"' % hashlib.md5(json.dumps(stats, sort_keys=True).encode()).hexdigest()
+            cached = _stats_cache[today] = (stats, etag)
+    
+    stats, etag = cached
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={STATS_CACHE_TTL}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(stats, headers=headers)
+
+
+async def _copy_import_feeds(session: AsyncSession, feeds):
+    """Bulk-load feeds through asyncpg's binary COPY protocol.
+    
+    Rows are copied into a transaction-scoped staging table and only the
+    feed URLs not already present are inserted into feed_sources.
+    
+    Returns:
+        Number of feeds inserted
+    """
+    await session.execute(text(
+        "CREATE TEMP TABLE _new_feeds (feed_url text, name text) ON COMMIT DROP"
+    ))
+    
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        '_new_feeds',
+        records=[(f['feed_url'], f['name']) for f in feeds],
+        columns=['feed_url', 'name']
+    )
+    
+    result = await session.execute(text("""
+        INSERT INTO feed_sources (feed_url, name, enabled, created_at)
+        SELECT DISTINCT ON (n.feed_url) n.feed_url, n.name, TRUE, now()
+        FROM _new_feeds n
+        LEFT JOIN feed_sources f USING (feed_url)
+        WHERE f.id IS NULL
+        ON CONFLICT (feed_url) DO NOTHING
+        RETURNING id
+    """))
+    return len(result.scalars().all())
 
 
 @router.post("/import-feeds")
-async def import_feeds_from_opml(username: str = Depends(verify_credentials)):
+async def import_feeds_from_opml(
+    session: AsyncSession = Depends(get_db_session),
+    username: str = Depends(verify_credentials)
+):
     """Import RSS feeds from OPML file into database."""
     opml_file = "seeds/feeds.opml"
     
     if not os.path.exists(opml_file):
         raise HTTPException(status_code=404, detail=f"OPML file not found: {opml_file}")
     
-    # Parse OPML
-    feeds = []
-    tree = ET.parse(opml_file)
-    root = tree.getroot()
-    
-    # Find all outline elements that have xmlUrl attribute (actual feeds)
-    for outline in root.findall('.//outline[@xmlUrl]'):
-        feed_url = outline.get('xmlUrl')
-        name = outline.get('title') or outline.get('text')
-        
-        if feed_url and name:
-            feeds.append({
-                'feed_url': feed_url,
-                'name': name
-            })
-    
-    # Import into database
-    async with async_session_maker() as session:
-        imported_count = 0
-        skipped_count = 0
-        
-        for feed_data in feeds:
-            # Check if feed already exists
-            result = await session.execute(
-                select(FeedSource).where(FeedSource.feed_url == feed_data['feed_url'])
-            )
-            existing_feed = result.scalar_one_or_none()
-            
-            if not existing_feed:
-                # Create new feed source
-                feed_source = FeedSource(
-                    feed_url=feed_data['feed_url'],
-                    name=feed_data['name'],
-                    enabled=True
-                )
-                session.add(feed_source)
-                imported_count += 1
-            else:
-                skipped_count += 1
-        
-        # Commit all changes
+    # Parse OPML in a worker thread so the event loop keeps serving requests
+    feeds = await asyncio.to_thread(parse_opml, opml_file)
+    
+    # Import into database with a single INSERT ... ON CONFLICT DO NOTHING,
+    # or via COPY into a staging table for large PostgreSQL imports
+    imported_count = 0
+    if len(feeds) > COPY_IMPORT_THRESHOLD and session.bind.dialect.name == "postgresql":
+        imported_count = await _copy_import_feeds(session, feeds)
+        await session.commit()
+    elif feeds:
+        stmt = (
+            dialect_insert(session, FeedSource)
+            .values([
+                {'feed_url': f['feed_url'], 'name': f['name'], 'enabled': True}
+                for f in feeds
+            ])
+            .on_conflict_do_nothing(index_elements=['feed_url'])
+            .returning(FeedSource.id)
+        )
+        result = await session.execute(stmt)
+        imported_count = len(result.scalars().all())
         await session.commit()
+    skipped_count = len(feeds) - imported_count
     
     return JSONResponse({
         "status": "success",
@@ -119,72 +189,93 @@ async def import_feeds_from_opml(username: str = Depends(verify_credentials)):
 
 
 @router.get("/feeds")
-async def list_feeds(username: str = Depends(verify_credentials)):
+async def list_feeds(
+    session: AsyncSession = Depends(get_readonly_session),
+    username: str = Depends(verify_credentials)
+):
     """List all feed sources in the database."""
-    async with async_session_maker() as session:
-        result = await session.execute(
-            select(FeedSource).order_by(FeedSource.name)
-        )
-        feeds = result.scalars().all()
-        
-        feed_list = []
-        for feed in feeds:
-            feed_list.append({
-                "id": feed.id,
-                "name": feed.name,
-                "feed_url": feed.feed_url,
-                "enabled": feed.enabled,
-                "last_fetched": feed.last_fetched.isoformat() if feed.last_fetched else None,
-                "created_at": feed.created_at.isoformat() if feed.created_at else None
-            })
-        
-        return {
-            "total": len(feed_list),
-            "feeds": feed_list
-        }
-
-
-@router.post("/process-feeds")
-async def process_feeds_manually(limit_feeds: int = 5, limit_items: int = 5, username: str = Depends(verify_credentials)):
+    # Select plain columns rather than ORM entities; the rows are only
+    # serialized, so identity-map bookkeeping would be wasted work
+    result = await session.execute(
+        select(
+            FeedSource.id,
+            FeedSource.name,
+            FeedSource.feed_url,
+            FeedSource.enabled,
+            FeedSource.last_fetched,
+            FeedSource.created_at
+        ).order_by(FeedSource.name)
+    )
+    
+    # orjson serializes the datetime columns natively
+    feed_list = [dict(feed) for feed in result.mappings()]
+    
+    # Returned as a response directly so FastAPI skips jsonable_encoder
+    return ORJSONResponse({
+        "total": len(feed_list),
+        "feeds": feed_list
+    })
+
+
+@router.post("/process-feeds", status_code=202)
+async def process_feeds_manually(
+    background_tasks: BackgroundTasks,
+    limit_feeds: int = 5,
+    limit_items: int = 5,
+    username: str = Depends(verify_credentials)
+):
     """
     Manually trigger feed processing (for testing).
     
+    Processing runs in the background after the response is sent, through
+    the direct Messages API rather than Message Batches so it finishes
+    within minutes; today's
+    counts in /api/stats show its progress. Returns 409 while another run
+    (manual or scheduled) is in progress.
+    
     Args:
         limit_feeds: Number of feeds to process (default: 5 for testing)
         limit_items: Items per feed (default: 5 for testing)
     """
     from services.scheduler import ProcessingService
     
-    try:
-        await ProcessingService.run_daily_processing(
-            limit_feeds=limit_feeds,
-            limit_items_per_feed=limit_items
-        )
-        
-        return JSONResponse({
-            "status": "success",
-            "message": f"Processed up to {limit_feeds} feeds with {limit_items} items each"
-        })
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    if ProcessingService.is_running():
+        raise HTTPException(status_code=409, detail="Feed processing is already running")
+    
+    logger.info(f"Queued manual processing run ({limit_feeds} feeds, {limit_items} items each)")
+    
+    background_tasks.add_task(
+        ProcessingService.run_daily_processing,
+        limit_feeds=limit_feeds,
+        limit_items_per_feed=limit_items,
+        use_batch_api=False
+    )
+    
+    return JSONResponse({
+        "status": "accepted",
+        "message": f"Processing up to {limit_feeds} feeds with {limit_items} items each"
+    }, status_code=202)
 
 @router.delete("/feeds/{feed_id}")
-async def delete_feed(feed_id: int, username: str = Depends(verify_credentials)):
+async def delete_feed(
+    feed_id: int,
+    session: AsyncSession = Depends(get_db_session),
+    username: str = Depends(verify_credentials)
+):
     """Delete a feed source by ID."""
-    async with async_session_maker() as session:
-        result = await session.execute(
-            select(FeedSource).where(FeedSource.id == feed_id)
-        )
-        feed = result.scalar_one_or_none()
-        
-        if not feed:
-            raise HTTPException(status_code=404, detail="Feed not found")
-        
-        await session.delete(feed)
-        await session.commit()
-        
-        return JSONResponse({
-            "status": "deleted",
-            "feed_id": feed_id,
-            "name": feed.name
-        })
+    result = await session.execute(
+        select(FeedSource).where(FeedSource.id == feed_id)
+    )
+    feed = result.scalar_one_or_none()
+    
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    
+    await session.delete(feed)
+    await session.commit()
+    
+    return JSONResponse({
+        "status": "deleted",
+        "feed_id": feed_id,
+        "name": feed.name
+    })
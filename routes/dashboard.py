@@ -1,57 +1,65 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select, func
-from datetime import datetime, timedelta
+import asyncio
 
 from models.database import async_session_maker
 from models.feed_item import FeedItem
 from models.processing_log import ProcessingLog
+from services.clock import today_utc
 from auth import verify_credentials
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request, username: str = Depends(verify_credentials)):
     """Dashboard homepage with processing stats."""
-    async with async_session_maker() as session:
-        # Get today's date
-        today = datetime.utcnow().date()
-        
-        # Get today's processing log
-        result = await session.execute(
-            select(ProcessingLog).where(ProcessingLog.run_date == today)
-        )
-        today_log = result.scalar_one_or_none()
-        
-        # Get pending review count
-        result = await session.execute(
-            select(func.count()).select_from(FeedItem).where(
-                FeedItem.is_priority_suggestion == True,
-                FeedItem.priority_feedback == None
+    # Get today's date
+    today = today_utc()
+    
+    # The three queries are independent, so run them concurrently on
+    # separate sessions instead of paying for each round-trip in turn
+    async def get_today_log():
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(ProcessingLog).where(ProcessingLog.run_date == today)
             )
-        )
-        pending_count = result.scalar()
-        
-        # Get recent logs
-        result = await session.execute(
-            select(ProcessingLog).order_by(ProcessingLog.run_date.desc()).limit(7)
-        )
-        recent_logs = result.scalars().all()
-        
-        stats = {
-            "today": {
-                "feeds_processed": today_log.feeds_processed if today_log else 0,
-                "items_fetched": today_log.items_fetched if today_log else 0,
-                "items_relevant": today_log.items_relevant if today_log else 0,
-                "items_priority_suggested": today_log.items_priority_suggested if today_log else 0,
-            },
-            "pending_review": pending_count,
-            "recent_logs": recent_logs
-        }
-        
-        return templates.TemplateResponse(
-            "dashboard.html",
-            {"request": request, "stats": stats}
-        )
+            return result.scalar_one_or_none()
+    
+    async def get_pending_count():
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(func.count()).select_from(FeedItem).where(
+                    FeedItem.is_priority_suggestion == True,
+                    FeedItem.priority_feedback == None
+                )
+            )
+            return result.scalar()
+    
+    async def get_recent_logs():
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(ProcessingLog).order_by(ProcessingLog.run_date.desc()).limit(7)
+            )
+            return result.scalars().all()
+    
+    today_log, pending_count, recent_logs = await asyncio.gather(
+        get_today_log(), get_pending_count(), get_recent_logs()
+    )
+    
+    stats = {
+        "today": {
+            "feeds_processed": today_log.feeds_processed if today_log else 0,
+            "items_fetched": today_log.items_fetched if today_log else 0,
+            "items_relevant": today_log.items_relevant if today_log else 0,
+            "items_priority_suggested": today_log.items_priority_suggested if today_log else 0,
+        },
+        "pending_review": pending_count,
+        "recent_logs": recent_logs
+    }
+    
+    return templates.TemplateResponse(
+        "dashboard.html",
+        {"request": request, "stats": stats}
+    )
@@ -1,86 +1,164 @@
-from fastapi import APIRouter
-from fastapi.responses import Response
+from fastapi import APIRouter, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy import select
-from datetime import datetime, timedelta, timezone
-from feedgen.feed import FeedGenerator
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from xml.sax.saxutils import escape
+import hashlib
 
 from models.database import async_session_maker
 from models.feed_item import FeedItem
+from services.clock import cutoff_utc
+from services.rss_cache import get_rss, rss_cache_generation, store_rss
 
 router = APIRouter()
 
-@router.get("/feeds/standard.xml")
-async def standard_feed():
-    """Standard RSS feed (all relevant items)."""
+BASE_URL = 'https://eratosthenes.onrender.com'
+
+RSS_FOOTER = '</channel>\n</rss>\n'
+
+
+def _rss_header(title: str, description: str) -> str:
+    """Render the XML declaration and channel metadata."""
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?>\n"
+        '<rss version="2.0">\n'
+        '<channel>\n'
+        f'<title>{escape(title)}</title>\n'
+        f'<link>{BASE_URL}</link>\n'
+        f'<description>{escape(description)}</description>\n'
+        '<language>en</language>\n'
+        f'<lastBuildDate>{format_datetime(datetime.now(timezone.utc))}</lastBuildDate>\n'
+    )
+
+
+def _rss_item(item) -> str:
+    """Render a single feed item row as an RSS <item> element."""
+    url = escape(item.url)
+    # Make datetime timezone-aware (UTC)
+    pub_date = item.published_date.replace(tzinfo=timezone.utc) if item.published_date else datetime.now(timezone.utc)
+    return (
+        '<item>'
+        f'<title>{escape(item.title)}</title>'
+        f'<link>{url}</link>'
+        f'<description>{escape(item.summary or item.content or "")}</description>'
+        f'<guid isPermaLink="false">{url}</guid>'
+        f'<pubDate>{format_datetime(pub_date)}</pubDate>'
+        '</item>\n'
+    )
+
+
+def _feed_query(cutoff_date: datetime, *criteria):
+    """Build the item query for a feed."""
+    # Only the columns written to the feed; no ORM objects are built
+    return (
+        select(
+            FeedItem.url,
+            FeedItem.title,
+            FeedItem.summary,
+            FeedItem.content,
+            FeedItem.published_date
+        )
+        .where(*criteria, FeedItem.published_date >= cutoff_date)
+        .order_by(FeedItem.published_date.desc())
+        .limit(100)
+    )
+
+
+def warmup_statements():
+    """Feed queries to prepare on pooled connections at startup."""
+    return [
+        _feed_query(datetime(1970, 1, 1, tzinfo=timezone.utc), FeedItem.is_relevant == True),
+        _feed_query(datetime(1970, 1, 1, tzinfo=timezone.utc), FeedItem.is_priority_approved == True),
+    ]
+
+
+async def _stream_rss(title: str, description: str, *criteria):
+    """Yield an RSS document chunk by chunk as matching items are read.
+
+    Items are streamed from the database and written out one at a time, so
+    the full feed is never held in memory.
+    """
+    # Items from last 30 days
+    stmt = _feed_query(cutoff_utc(days=30), *criteria)
+
+    yield _rss_header(title, description)
     async with async_session_maker() as session:
-        # Get relevant items from last 30 days
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
-        result = await session.execute(
-            select(FeedItem)
-            .where(
-                FeedItem.is_relevant == True,
-                FeedItem.published_date >= cutoff_date
-            )
-            .order_by(FeedItem.published_date.desc())
-            .limit(100)
+        items = await session.stream(stmt)
+        async for item in items:
+            yield _rss_item(item)
+    yield RSS_FOOTER
+
+
+async def _cache_rss(key: str, chunks):
+    """Pass RSS chunks through to the client, then cache the finished document."""
+    generation = rss_cache_generation()
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+
+    body = ''.join(parts).encode('utf-8')
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    last_modified = format_datetime(datetime.now(timezone.utc), usegmt=True)
+    store_rss(key, generation, (body, etag, last_modified))
+
+
+def _not_modified(request: Request, etag: str, last_modified: str) -> bool:
+    """Whether a conditional GET's validators match the cached document.
+    
+    If-None-Match takes precedence; If-Modified-Since is only checked when
+    it is absent, as many feed readers send only that.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match == etag
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # Unparseable or zone-less date; serve the feed
+        return False
+
+
+def _rss_response(request: Request, key: str, title: str, description: str, *criteria):
+    """Serve a feed from the cache, answering conditional GETs with 304."""
+    cached = get_rss(key)
+    if cached is None:
+        return StreamingResponse(
+            _cache_rss(key, _stream_rss(title, description, *criteria)),
+            media_type="application/rss+xml"
         )
-        items = result.scalars().all()
-        
-        # Generate RSS feed
-        fg = FeedGenerator()
-        fg.id('https://eratosthenes.onrender.com/feeds/standard.xml')
-        fg.title('Eratosthenes - InfoSec News (All Relevant)')
-        fg.description('Curated InfoSec news filtered by Claude AI')
-        fg.link(href='https://eratosthenes.onrender.com', rel='alternate')
-        fg.language('en')
-        
-        for item in items:
-            fe = fg.add_entry()
-            fe.id(item.url)
-            fe.title(item.title)
-            fe.link(href=item.url)
-            fe.description(item.summary or item.content or '')
-            # Make datetime timezone-aware (UTC)
-            pub_date = item.published_date.replace(tzinfo=timezone.utc) if item.published_date else datetime.now(timezone.utc)
-            fe.pubDate(pub_date)
-        
-        rss_str = fg.rss_str(pretty=True)
-        return Response(content=rss_str, media_type="application/rss+xml")
+
+    body, etag, last_modified = cached
+    headers = {"ETag": etag, "Last-Modified": last_modified}
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/rss+xml", headers=headers)
+
+
+@router.get("/feeds/standard.xml")
+async def standard_feed(request: Request):
+    """Standard RSS feed (all relevant items)."""
+    return _rss_response(
+        request,
+        'standard',
+        'Eratosthenes - InfoSec News (All Relevant)',
+        'Curated InfoSec news filtered by Claude AI',
+        FeedItem.is_relevant == True
+    )
 
 @router.get("/feeds/priority.xml")
-async def priority_feed():
+async def priority_feed(request: Request):
     """Priority RSS feed (approved items only)."""
-    async with async_session_maker() as session:
-        # Get approved priority items from last 30 days
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
-        result = await session.execute(
-            select(FeedItem)
-            .where(
-                FeedItem.is_priority_approved == True,
-                FeedItem.published_date >= cutoff_date
-            )
-            .order_by(FeedItem.published_date.desc())
-            .limit(100)
-        )
-        items = result.scalars().all()
-        
-        # Generate RSS feed
-        fg = FeedGenerator()
-        fg.id('https://eratosthenes.onrender.com/feeds/priority.xml')
-        fg.title('Eratosthenes - InfoSec News (Priority)')
-        fg.description('High-priority InfoSec news approved by SOC analysts')
-        fg.link(href='https://eratosthenes.onrender.com', rel='alternate')
-        fg.language('en')
-        
-        for item in items:
-            fe = fg.add_entry()
-            fe.id(item.url)
-            fe.title(item.title)
-            fe.link(href=item.url)
-            fe.description(item.summary or item.content or '')
-            # Make datetime timezone-aware (UTC)
-            pub_date = item.published_date.replace(tzinfo=timezone.utc) if item.published_date else datetime.now(timezone.utc)
-            fe.pubDate(pub_date)
-        
-        rss_str = fg.rss_str(pretty=True)
-        return Response(content=rss_str, media_type="application/rss+xml")
+    return _rss_response(
+        request,
+        'priority',
+        'Eratosthenes - InfoSec News (Priority)',
+        'High-priority InfoSec news approved by SOC analysts',
+        FeedItem.is_priority_approved == True
+    )
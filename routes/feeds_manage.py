@@ -1,29 +1,32 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.database import async_session_maker
+from models.database import get_readonly_session
 from models.feed_source import FeedSource
 from auth import verify_credentials
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/feeds-manage", response_class=HTMLResponse)
-async def manage_feeds(request: Request, username: str = Depends(verify_credentials)):
+async def manage_feeds(
+    request: Request,
+    session: AsyncSession = Depends(get_readonly_session),
+    username: str = Depends(verify_credentials)
+):
     """Feed management interface."""
-    async with async_session_maker() as session:
-        result = await session.execute(
-            select(FeedSource).order_by(FeedSource.name)
-        )
-        feeds = result.scalars().all()
+    result = await session.execute(
+        select(FeedSource).order_by(FeedSource.name)
+    )
+    feeds = result.scalars().all()
 
-        return templates.TemplateResponse(
-            "feeds_manage.html",
-            {
-                "request": request,
-                "feeds": feeds,
-                "total_feeds": len(feeds)
-            }
-        )
+    return templates.TemplateResponse(
+        "feeds_manage.html",
+        {
+            "request": request,
+            "feeds": feeds,
+            "total_feeds": len(feeds)
+        }
+    )
@@ -1,82 +1,96 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, Request, HTTPException, Depends, Query
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, update
-from datetime import datetime
+from sqlalchemy import select, tuple_, update
+from datetime import datetime, timezone
+from typing import Optional
 
 from models.database import async_session_maker
 from models.feed_item import FeedItem
+from services.rss_cache import invalidate_rss_cache
 from auth import verify_credentials
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/review", response_class=HTMLResponse)
-async def review_queue(request: Request, page: int = 1, limit: int = 20, username: str = Depends(verify_credentials)):
-    """Priority review queue interface."""
+async def review_queue(
+    request: Request,
+    cursor: Optional[datetime] = None,
+    id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    username: str = Depends(verify_credentials)
+):
+    """Priority review queue interface.
+    
+    Paginated by keyset: ``cursor`` and ``id`` are the published date and id
+    of the last item on the previous page.
+    """
+    query = (
+        select(FeedItem)
+        .where(
+            FeedItem.is_priority_suggestion == True,
+            FeedItem.priority_feedback == None
+        )
+        .order_by(FeedItem.published_date.desc(), FeedItem.id.desc())
+        .limit(limit)
+    )
+    if cursor is not None and id is not None:
+        query = query.where(
+            tuple_(FeedItem.published_date, FeedItem.id) < tuple_(cursor, id)
+        )
+    
     async with async_session_maker() as session:
         # Get pending priority suggestions
-        offset = (page - 1) * limit
-        result = await session.execute(
-            select(FeedItem)
-            .where(
-                FeedItem.is_priority_suggestion == True,
-                FeedItem.priority_feedback == None
-            )
-            .order_by(FeedItem.published_date.desc())
-            .offset(offset)
-            .limit(limit)
-        )
+        result = await session.execute(query)
         items = result.scalars().all()
         
+        # Only offer a next page when this one came back full
+        next_page = None
+        if items and len(items) == limit and items[-1].published_date is not None:
+            next_page = {"cursor": items[-1].published_date.isoformat(), "id": items[-1].id}
+        
         return templates.TemplateResponse(
             "review.html",
             {
                 "request": request,
                 "items": items,
-                "page": page,
+                "next_page": next_page,
                 "limit": limit
             }
         )
 
-@router.post("/review/{item_id}/approve")
-async def approve_priority(item_id: int, username: str = Depends(verify_credentials)):
-    """Approve a priority suggestion."""
+async def _record_feedback(item_id: int, approved: bool):
+    """Store the reviewer's decision on a priority suggestion.
+    
+    A single UPDATE ... RETURNING; raises 404 if the item doesn't exist.
+    """
     async with async_session_maker() as session:
         result = await session.execute(
-            select(FeedItem).where(FeedItem.id == item_id)
+            update(FeedItem)
+            .where(FeedItem.id == item_id)
+            .values(
+                priority_feedback=approved,
+                is_priority_approved=approved,
+                reviewed_at=datetime.now(timezone.utc)
+            )
+            .returning(FeedItem.id)
         )
-        item = result.scalar_one_or_none()
         
-        if not item:
+        if result.first() is None:
             raise HTTPException(status_code=404, detail="Item not found")
         
-        # Update item
-        item.priority_feedback = True
-        item.is_priority_approved = True
-        item.reviewed_at = datetime.utcnow()
-        
         await session.commit()
-        
-        return JSONResponse({"status": "approved", "item_id": item_id})
+    
+    invalidate_rss_cache()
+
+@router.post("/review/{item_id}/approve")
+async def approve_priority(item_id: int, username: str = Depends(verify_credentials)):
+    """Approve a priority suggestion."""
+    await _record_feedback(item_id, approved=True)
+    return JSONResponse({"status": "approved", "item_id": item_id})
 
 @router.post("/review/{item_id}/reject")
 async def reject_priority(item_id: int, username: str = Depends(verify_credentials)):
     """Reject a priority suggestion."""
-    async with async_session_maker() as session:
-        result = await session.execute(
-            select(FeedItem).where(FeedItem.id == item_id)
-        )
-        item = result.scalar_one_or_none()
-        
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        
-        # Update item
-        item.priority_feedback = False
-        item.is_priority_approved = False
-        item.reviewed_at = datetime.utcnow()
-        
-        await session.commit()
-        
-        return JSONResponse({"status": "rejected", "item_id": item_id})
+    await _record_feedback(item_id, approved=False)
+    return JSONResponse({"status": "rejected", "item_id": item_id})
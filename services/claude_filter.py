@@ -1,118 +1,256 @@
 """Claude AI filtering service for RSS feed items."""
+import asyncio
+import hashlib
 import logging
 import os
-import json
+from dataclasses import dataclass
 from typing import List, Dict
+from aiolimiter import AsyncLimiter
 from anthropic import AsyncAnthropic
+from cachetools import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Items per Claude request; the fixed rubric is amortized across the batch
+BATCH_SIZE = 15
+
+# Concurrent Messages API requests when not using the Message Batches API
+MAX_CONCURRENT_REQUESTS = 5
+
+# Messages API request budget: at most this many requests per minute
+REQUESTS_PER_MINUTE = 50
+
+# Seconds between Message Batches API status checks
+BATCH_POLL_INTERVAL = 30
+
+# Relevance decisions remembered per (url, title), so items a feed keeps
+# republishing (irrelevant ones are never stored) aren't re-sent to Claude
+DECISION_CACHE_SIZE = 20000
+DECISION_CACHE_TTL = 7 * 24 * 3600
+
+# Static instructions shared by every relevance request. Kept byte-for-byte
+# stable at module scope since the prompt cache is keyed on exact content.
+RELEVANCE_SYSTEM_PROMPT = """You are filtering RSS feed items for a Security Operations Center (SOC) analyst.
+
+Evaluate each item in the user message and determine if it is directly relevant to information security / cybersecurity.
+
+INCLUDE items about:
+- Vulnerabilities, exploits, CVEs
+- Data breaches, incidents, threat actors
+- Security tools, techniques, defensive measures
+- Malware, ransomware, attack campaigns
+- Security research and analysis
+
+EXCLUDE items about:
+- Marketing content (product launches, webinars, ebooks)
+- General business/tech news not related to security
+- Opinion pieces without technical substance
+- Job postings, company announcements
+- Conference advertisements
+
+Record your evaluation with the record_relevance tool: one result per item, in the same order as the items."""
+
+# Claude is forced to answer through this tool, so replies arrive as
+# schema-valid structured input rather than free text to be parsed
+RELEVANCE_TOOL = {
+    "name": "record_relevance",
+    "description": "Record the relevance decision for each feed item, in order.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "is_relevant": {"type": "boolean"},
+                        "reasoning": {"type": "string", "description": "brief explanation"}
+                    },
+                    "required": ["is_relevant", "reasoning"]
+                }
+            }
+        },
+        "required": ["results"]
+    }
+}
+
+
+@dataclass
+class FilterResult:
+    """Outcome of a filter_relevance call."""
+    items: List[Dict]
+    # Claude requests made; cached decisions cost none
+    api_calls: int
+
 
 class ClaudeFilter:
     """Filter RSS feed items using Claude AI."""
 
-    def __init__(self):
+    def __init__(self, use_batch_api: bool = True):
+        """
+        Args:
+            use_batch_api: Submit relevance filtering through the Message
+                Batches API (half price, processed in parallel server-side,
+                but results can take minutes). Disable for interactive runs.
+        """
         api_key = os.getenv('ANTHROPIC_API_KEY')
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable not set")
 
         self.client = AsyncAnthropic(api_key=api_key)
         self.model = "claude-sonnet-4-20250514"
+        self.use_batch_api = use_batch_api
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._limiter = AsyncLimiter(REQUESTS_PER_MINUTE, 60)
+        self._decisions = TTLCache(maxsize=DECISION_CACHE_SIZE, ttl=DECISION_CACHE_TTL)
 
-    async def filter_relevance(self, items: List[Dict]) -> List[Dict]:
+    async def filter_relevance(self, items: List[Dict]) -> FilterResult:
         """Filter items for InfoSec relevance (Pass 1).
         
-        Processes items in batches of 10 for cost efficiency.
+        Items with a cached decision are answered from the cache; the rest
+        are sent in batches of BATCH_SIZE for cost efficiency.
         
         Args:
             items: List of feed items to filter
             
         Returns:
-            List of items with is_relevant and reasoning fields added
+            FilterResult holding the same items, in order, with is_relevant
+            and reasoning fields added, and the number of Claude requests made.
+            Items that could not be filtered also get filter_failed=True
         """
-        batch_size = 10
-        filtered_items = []
-
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i + batch_size]
-            try:
-                results = await self._filter_batch(batch)
-                filtered_items.extend(results)
-            except Exception as e:
-                logger.error(f"Failed to filter batch: {e}")
-                # Mark all items as not relevant if filtering fails
-                for item in batch:
-                    item['is_relevant'] = False
-                    item['reasoning'] = f"Filter error: {str(e)}"
-                filtered_items.extend(batch)
-
-        return filtered_items
+        uncached = []
+        for item in items:
+            decision = self._decisions.get(self._decision_key(item))
+            if decision is None:
+                uncached.append(item)
+            else:
+                item['is_relevant'], item['reasoning'] = decision
 
-    async def _filter_batch(self, items: List[Dict]) -> List[Dict]:
-        """Filter a batch of items for relevance."""
-        # Build prompt with all items in batch
-        items_text = ""
-        for idx, item in enumerate(items, 1):
-            # Truncate content to avoid token limits
-            content = item.get('content', '')[:500]
-            if not content:
-                content = item.get('summary', '')[:500]
+        if len(uncached) < len(items):
+            logger.info(f"{len(items) - len(uncached)} of {len(items)} items answered from the decision cache")
 
-            items_text += f"\n## Item {idx}\n"
-            items_text += f"Title: {item['title']}\n"
-            items_text += f"Content: {content}\n"
+        # One Claude request per batch, whether submitted through the
+        # Message Batches API or sent directly
+        batches = [uncached[i:i + BATCH_SIZE] for i in range(0, len(uncached), BATCH_SIZE)]
+        if not batches:
+            return FilterResult(items, 0)
 
-        prompt = f"""You are filtering RSS feed items for a Security Operations Center (SOC) analyst.
+        if self.use_batch_api:
+            await self._filter_with_batch_api(batches)
+            return FilterResult(items, len(batches))
 
-Evaluate each item below and determine if it is directly relevant to information security / cybersecurity.
+        async def filter_one(batch):
+            async with self._semaphore:
+                try:
+                    await self._filter_batch(batch)
+                except Exception as e:
+                    self._mark_failed(batch, e)
 
-INCLUDE items about:
-- Vulnerabilities, exploits, CVEs
-- Data breaches, incidents, threat actors
-- Security tools, techniques, defensive measures
-- Malware, ransomware, attack campaigns
-- Security research and analysis
+        await asyncio.gather(*(filter_one(batch) for batch in batches))
+        return FilterResult(items, len(batches))
 
-EXCLUDE items about:
-- Marketing content (product launches, webinars, ebooks)
-- General business/tech news not related to security
-- Opinion pieces without technical substance
-- Job postings, company announcements
-- Conference advertisements
+    @staticmethod
+    def _decision_key(item: Dict) -> bytes:
+        """Cache key for an item's relevance decision."""
+        return hashlib.blake2b(
+            f"{item['url']}\0{item['title']}".encode(), digest_size=16
+        ).digest()
+
+    async def _filter_with_batch_api(self, batches: List[List[Dict]]):
+        """Filter all batches with one Message Batches API submission.
+        
+        Each batch becomes one request whose custom_id is its index, so
+        results (which arrive in any order) can be matched back.
+        """
+        try:
+            message_batch = await self.client.messages.batches.create(
+                requests=[
+                    {"custom_id": str(idx), "params": self._relevance_request(batch)}
+                    for idx, batch in enumerate(batches)
+                ]
+            )
+            logger.info(f"Submitted message batch {message_batch.id} with {len(batches)} requests")
 
-{items_text}
+            while message_batch.processing_status != "ended":
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+                message_batch = await self.client.messages.batches.retrieve(message_batch.id)
 
-Respond with a JSON array where each element corresponds to an item (in order) with this structure:
-{{
-  "is_relevant": true/false,
-  "reasoning": "brief explanation"
-}}
+            pending = dict(enumerate(batches))
+            async for entry in await self.client.messages.batches.results(message_batch.id):
+                batch = pending.pop(int(entry.custom_id))
+                if entry.result.type != "succeeded":
+                    self._mark_failed(batch, f"batch request {entry.result.type}")
+                    continue
+                try:
+                    self._apply_results(batch, entry.result.message.content[0].input['results'])
+                except Exception as e:
+                    self._mark_failed(batch, e)
 
-Only return the JSON array, nothing else."""
+            for batch in pending.values():
+                self._mark_failed(batch, "no result returned for batch request")
 
-        # Call Claude
-        response = await self.client.messages.create(
-            model=self.model,
-            max_tokens=4096,
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
-        )
+        except Exception as e:
+            for batch in batches:
+                self._mark_failed(batch, e)
+
+    @staticmethod
+    def _mark_failed(items: List[Dict], error):
+        """Mark all items as not relevant, and as failed, when filtering fails."""
+        logger.error(f"Failed to filter batch: {error}")
+        for item in items:
+            item['is_relevant'] = False
+            item['reasoning'] = f"Filter error: {str(error)}"
+            item['filter_failed'] = True
 
-        # Parse response
-        response_text = response.content[0].text.strip()
+    async def _filter_batch(self, items: List[Dict]) -> List[Dict]:
+        """Filter a batch of items for relevance."""
+        async with self._limiter:
+            response = await self.client.messages.create(**self._relevance_request(items))
+        return self._apply_results(items, response.content[0].input['results'])
 
-        # Remove markdown code blocks if present
-        if response_text.startswith('```'):
-            response_text = response_text.split('\n', 1)[1]
-            response_text = response_text.rsplit('```', 1)[0]
+    def _relevance_request(self, items: List[Dict]) -> Dict:
+        """Build the Messages API parameters for a batch of items."""
+        # Build prompt with all items in batch; content is truncated to
+        # avoid token limits
+        items_text = "".join(
+            f"\n## Item {idx}\n"
+            f"Title: {item['title']}\n"
+            f"Content: {(item.get('content') or item.get('summary') or '')[:500]}\n"
+            for idx, item in enumerate(items, 1)
+        )
 
-        results = json.loads(response_text)
+        return {
+            "model": self.model,
+            "max_tokens": 4096,
+            "tools": [RELEVANCE_TOOL],
+            "tool_choice": {"type": "tool", "name": RELEVANCE_TOOL["name"]},
+            # The tools + rubric prefix is identical for every request and
+            # marked cacheable, but it is currently shorter than the model's
+            # minimum cacheable prompt length, so nothing is cached until it
+            # grows past that
+            "system": [{
+                "type": "text",
+                "text": RELEVANCE_SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }],
+            "messages": [{
+                "role": "user",
+                "content": items_text
+            }]
+        }
 
-        # Add results to items
+    def _apply_results(self, items: List[Dict], results: List[Dict]) -> List[Dict]:
+        """Add the record_relevance tool results to the items and cache them.
+        
+        Raises ValueError unless there is exactly one result per item, so the
+        caller marks the whole batch failed.
+        """
+        if len(results) != len(items):
+            raise ValueError(f"expected {len(items)} results, got {len(results)}")
+        
         for item, result in zip(items, results):
             item['is_relevant'] = result['is_relevant']
             item['reasoning'] = result['reasoning']
+            self._decisions[self._decision_key(item)] = (item['is_relevant'], item['reasoning'])
 
         return items
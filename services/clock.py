@@ -0,0 +1,24 @@
+"""Coarse UTC clock helpers for request handlers."""
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _today_utc(minute: int) -> date:
+    return datetime.now(timezone.utc).date()
+
+
+@lru_cache(maxsize=1)
+def _cutoff_utc(minute: int, days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def today_utc() -> date:
+    """Current UTC date, recomputed at most once a minute."""
+    return _today_utc(int(time.time() // 60))
+
+
+def cutoff_utc(days: int) -> datetime:
+    """UTC datetime ``days`` ago, recomputed at most once a minute."""
+    return _cutoff_utc(int(time.time() // 60), days)
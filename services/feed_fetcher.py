@@ -1,55 +1,188 @@
 """RSS feed fetching and parsing service."""
+import asyncio
 import logging
+import aiohttp
 import feedparser
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from models.feed_item import url_hash
 
 logger = logging.getLogger(__name__)
 
+# Feeds downloaded at once; the processing run starts one fetch worker per
+# slot (FeedFetcher.max_concurrency)
+MAX_CONCURRENT_FETCHES = 15
+
+# Seconds allowed for a single feed download
+FETCH_TIMEOUT = 30
+
+USER_AGENT = 'Eratosthenes/1.0 (+https://eratosthenes.onrender.com)'
+
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = frozenset({'fbclid', 'gclid', 'mc_cid', 'mc_eid'})
+
+# Feeds are compressible XML; aiohttp decodes these transparently (br needs
+# the Brotli package from aiohttp[speedups])
+ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+def create_session() -> aiohttp.ClientSession:
+    """Create an HTTP session configured for fetching feeds."""
+    # Cap open sockets overall and per host, cache DNS lookups and keep idle
+    # connections alive for reuse
+    connector = aiohttp.TCPConnector(
+        limit=20, limit_per_host=4, ttl_dns_cache=300, keepalive_timeout=60
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT),
+        headers={'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+    )
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a fetch_feed call."""
+    items: List[Dict]
+    # FeedSource etag / last_modified values from a successful response, for
+    # the caller to store once the items are safely processed; None when the
+    # feed was unchanged or could not be fetched
+    validators: Optional[Dict[str, Optional[str]]] = None
+
 
 class FeedFetcher:
-    """Fetch and parse RSS feeds."""
+    """Fetch and parse RSS feeds.
 
-    @staticmethod
-    async def fetch_feed(feed_url: str, max_items: int = 50) -> List[Dict]:
+    Use as an async context manager so all fetches share one HTTP session:
+
+        async with FeedFetcher() as fetcher:
+            result = await fetcher.fetch_feed(feed_source)
+
+    Pass ``session`` (see create_session) to reuse a session across several
+    fetchers; it is then left open for the caller to close.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_FETCHES,
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.max_concurrency = max_concurrency
+        self.session = session
+        self._owns_session = session is None
+
+    async def __aenter__(self):
+        if self._owns_session:
+            self.session = create_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_feed(self, feed_source, max_items: int = 50) -> FetchResult:
         """Fetch and parse a single RSS feed.
+
+        The request is conditional on the ETag / Last-Modified validators
+        stored on the feed source; an unchanged feed (304) yields no items.
+        Validators from a successful response are returned rather than
+        written to feed_source: storing them before the items are processed
+        would make the next run's 304 skip items that were never handled.
         
         Args:
-            feed_url: URL of the RSS feed
+            feed_source: FeedSource to fetch
             max_items: Maximum number of items to return
             
         Returns:
-            List of feed items with normalized fields
+            FetchResult with the feed items (normalized fields) and the
+            response's validators
         """
+        feed_url = feed_source.feed_url
+        headers = {}
+        if feed_source.etag:
+            headers['If-None-Match'] = feed_source.etag
+        if feed_source.last_modified:
+            headers['If-Modified-Since'] = feed_source.last_modified
+
         try:
-            # Parse feed (feedparser handles various formats)
-            feed = feedparser.parse(feed_url)
-
-            if feed.bozo:
-                # Feed has parsing errors
-                logger.warning(f"Feed parsing errors for {feed_url}: {feed.bozo_exception}")
-
-            items = []
-            for entry in feed.entries[:max_items]:
-                # Extract fields with fallbacks
-                item = {
-                    'url': entry.get('link', ''),
-                    'title': entry.get('title', 'No title'),
-                    'content': FeedFetcher._extract_content(entry),
-                    'summary': entry.get('summary', ''),
-                    'published_date': FeedFetcher._parse_date(entry)
-                }
-
-                # Only include items with a URL
-                if item['url']:
-                    items.append(item)
+            async with self.session.get(feed_url, headers=headers) as response:
+                if response.status == 304:
+                    logger.info(f"Not modified: {feed_url}")
+                    return FetchResult([])
+
+                response.raise_for_status()
+                content = await response.read()
+                # feedparser looks headers up by lowercase name
+                response_headers = {k.lower(): v for k, v in response.headers.items()}
+
+            # feedparser is pure Python and CPU-bound; parse in a worker
+            # thread so other downloads keep progressing
+            items = await asyncio.to_thread(
+                FeedFetcher._parse_items, feed_url, content, response_headers, max_items
+            )
 
             logger.info(f"Fetched {len(items)} items from {feed_url}")
-            return items
+            return FetchResult(items, {
+                'etag': response_headers.get('etag'),
+                'last_modified': response_headers.get('last-modified')
+            })
 
         except Exception as e:
             logger.error(f"Failed to fetch feed {feed_url}: {e}")
-            return []
+            return FetchResult([])
+
+    @staticmethod
+    def _parse_items(feed_url: str, content: bytes, response_headers: Dict, max_items: int) -> List[Dict]:
+        """Parse downloaded feed content into normalized items."""
+        # Parse feed (feedparser handles various formats)
+        feed = feedparser.parse(content, response_headers=response_headers)
+
+        if feed.bozo:
+            # Feed has parsing errors
+            logger.warning(f"Feed parsing errors for {feed_url}: {feed.bozo_exception}")
+
+        items = []
+        for entry in feed.entries[:max_items]:
+            # Extract fields with fallbacks; the summary falls back to the
+            # start of the content, sliced only when it is actually needed
+            content = FeedFetcher._extract_content(entry)
+            item = {
+                'url': FeedFetcher._normalize_url(entry.get('link', '')),
+                'title': entry.get('title', 'No title'),
+                'content': content,
+                'summary': entry.get('summary') or (content[:500] if content else ''),
+                'published_date': FeedFetcher._parse_date(entry)
+            }
+
+            # Only include items with a URL
+            if item['url']:
+                item['url_hash'] = url_hash(item['url'])
+                items.append(item)
+
+        return items
+
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        """Normalize an item URL so cosmetic variants deduplicate together.
+
+        Lowercases the scheme and host and drops tracking parameters (utm_*
+        and friends). The fragment is kept: hash-routed sites (#/path, #!)
+        identify articles by it.
+        """
+        if not url:
+            return url
+
+        parts = urlsplit(url.strip())
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        kept = [
+            (key, value) for key, value in params
+            if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+        ]
+        # Re-encode only when something was dropped, to keep the original
+        # escaping otherwise
+        query = parts.query if len(kept) == len(params) else urlencode(kept)
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, parts.fragment))
 
     @staticmethod
     def _extract_content(entry) -> str:
@@ -74,16 +207,16 @@ class FeedFetcher:
         # Try published_parsed
         if hasattr(entry, 'published_parsed') and entry.published_parsed:
             try:
-                return datetime(*entry.published_parsed[:6])
+                return datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
             except Exception:
                 pass
 
         # Try updated_parsed
         if hasattr(entry, 'updated_parsed') and entry.updated_parsed:
             try:
-                return datetime(*entry.updated_parsed[:6])
+                return datetime(*entry.updated_parsed[:6], tzinfo=timezone.utc)
             except Exception:
                 pass
 
         # Default to now
-        return datetime.utcnow()
+        return datetime.now(timezone.utc)
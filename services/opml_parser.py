@@ -0,0 +1,44 @@
+"""OPML parsing service for feed imports."""
+from typing import List, Dict
+
+import lxml.etree as ET
+
+
+class _FeedOutlineTarget:
+    """Parser target that collects feed outlines as their start tags are seen.
+
+    No element tree is built: lxml calls start() for each opening tag and
+    only outline elements carrying an xmlUrl attribute are kept.
+    """
+
+    def __init__(self):
+        self.feeds = []
+
+    def start(self, tag, attrib):
+        if tag != 'outline':
+            return
+
+        feed_url = attrib.get('xmlUrl')
+        name = attrib.get('title') or attrib.get('text')
+
+        if feed_url and name:
+            self.feeds.append({
+                'feed_url': feed_url,
+                'name': name
+            })
+
+    def close(self) -> List[Dict]:
+        return self.feeds
+
+
+def parse_opml(opml_file: str) -> List[Dict]:
+    """Extract feed URLs and names from an OPML file in a single pass.
+
+    Args:
+        opml_file: Path to the OPML file
+
+    Returns:
+        List of dicts with feed_url and name keys
+    """
+    parser = ET.XMLParser(target=_FeedOutlineTarget())
+    return ET.parse(opml_file, parser)
@@ -0,0 +1,34 @@
+"""In-process cache of the rendered RSS feeds."""
+from typing import Optional
+
+# Serialized feeds keyed by endpoint: (body, etag, last_modified). Feed
+# content only changes when processing runs or a review decision is made,
+# and those paths call invalidate_rss_cache().
+_rss_cache: dict[str, tuple[bytes, str, str]] = {}
+_rss_cache_generation = 0
+
+
+def get_rss(key: str) -> Optional[tuple[bytes, str, str]]:
+    """Return the cached (body, etag, last_modified) for a feed, if any."""
+    return _rss_cache.get(key)
+
+
+def rss_cache_generation() -> int:
+    """Current cache generation; bumped by every invalidation."""
+    return _rss_cache_generation
+
+
+def store_rss(key: str, generation: int, document: tuple[bytes, str, str]):
+    """Cache a feed rendered during ``generation``.
+
+    Dropped if the cache was invalidated while the document was being built.
+    """
+    if generation == _rss_cache_generation:
+        _rss_cache[key] = document
+
+
+def invalidate_rss_cache():
+    """Drop cached RSS documents so the next request rebuilds them."""
+    global _rss_cache_generation
+    _rss_cache_generation += 1
+    _rss_cache.clear()
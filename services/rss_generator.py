@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List
 from feedgen.feed import FeedGenerator
 
@@ -13,8 +13,8 @@ class RSSGenerator:
     def __init__(self):
         self.base_url = "https://eratosthenes.onrender.com"  # Update with actual domain
     
-    def generate_standard_feed(self, items: List[FeedItem]) -> str:
-        """Generate standard RSS feed with all relevant items."""
+    def generate_standard_feed(self, items: List[FeedItem]) -> bytes:
+        """Generate standard RSS feed with all relevant items, as UTF-8 XML bytes."""
         fg = self._create_base_feed(
             title="Eratosthenes - Security News (All Relevant)",
             description="Curated security news filtered for InfoSec relevance",
@@ -30,10 +30,10 @@ class RSSGenerator:
             fe.pubDate(item.published_date)
             fe.author(name=item.source_feed.name if item.source_feed else "Unknown")
         
-        return fg.rss_str(pretty=True).decode('utf-8')
+        return fg.rss_str(pretty=False)
     
-    def generate_priority_feed(self, items: List[FeedItem]) -> str:
-        """Generate priority RSS feed with only approved priority items."""
+    def generate_priority_feed(self, items: List[FeedItem]) -> bytes:
+        """Generate priority RSS feed with only approved priority items, as UTF-8 XML bytes."""
         fg = self._create_base_feed(
             title="Eratosthenes - Priority Security News",
             description="High-priority security news requiring immediate SOC attention",
@@ -55,7 +55,7 @@ class RSSGenerator:
             fe.pubDate(item.published_date)
             fe.author(name=item.source_feed.name if item.source_feed else "Unknown")
         
-        return fg.rss_str(pretty=True).decode('utf-8')
+        return fg.rss_str(pretty=False)
     
     def _create_base_feed(self, title: str, description: str, link: str) -> FeedGenerator:
         """Create base RSS feed with common metadata."""
@@ -67,7 +67,7 @@ class RSSGenerator:
         fg.generator('Eratosthenes 1.0.0')
         fg.managingEditor('hecate2104@proton.me (ApthNZ)')
         fg.webMaster('hecate2104@proton.me (ApthNZ)')
-        fg.lastBuildDate(datetime.now())
+        fg.lastBuildDate(datetime.now(timezone.utc))
         fg.ttl(60)  # 1 hour TTL
         
         return fg
@@ -1,159 +1,502 @@
+import asyncio
 import logging
-from datetime import datetime
-from sqlalchemy import select
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import bindparam, select, update
 
-from models.database import async_session_maker
+from models.database import async_session_maker, dialect_insert
 from models.processing_log import ProcessingLog
 from models.feed_source import FeedSource
 from models.feed_item import FeedItem
-from services.feed_fetcher import FeedFetcher
-from services.claude_filter import ClaudeFilter
+from services.rss_cache import invalidate_rss_cache
+from services.feed_fetcher import FeedFetcher, create_session
+from services.claude_filter import ClaudeFilter, BATCH_SIZE as CLAUDE_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Items fetched per feed by a full (scheduled) run
+DEFAULT_ITEMS_PER_FEED = 10
+
+# Rows per INSERT statement; keeps bind parameter counts within driver limits
+INSERT_CHUNK_SIZE = 1000
+
+# url_hash values per IN lookup of already-stored items, for the same reason
+LOOKUP_CHUNK_SIZE = 1000
+
+# Items from across feeds coalesced into one filter_relevance call, and the
+# longest a partial batch waits for more feeds before it is sent anyway.
+# Direct Messages API only: with the Message Batches API each call is a
+# submission polled until it ends, so the run's items go in one call.
+FILTER_BATCH_ITEMS = 4 * CLAUDE_BATCH_SIZE
+FILTER_BATCH_MAX_WAIT = 2.0
+
+# Coalesced batches being filtered by Claude at once
+MAX_CONCURRENT_FILTER_BATCHES = 4
+
+# Seconds a fetch worker spends on one feed (download, parse and dedup)
+# before giving up on it; bounds how long one slow host can hold a worker
+FEED_TIMEOUT = 60
+
+# Feeds processed by each run; built once rather than on every run
+_ENABLED_FEEDS_STMT = select(FeedSource).where(FeedSource.enabled.is_(True))
+
+# Created on first use, one per use_batch_api mode, and kept across runs, so
+# the Anthropic client and its pooled keep-alive connections (and the
+# decision cache) are reused by every run
+_claude_filters: Dict[bool, ClaudeFilter] = {}
+
+# Held for the duration of a processing run; scheduled and manual runs must
+# not overlap (they would race on today's processing log and pay Claude
+# twice for the same items)
+_run_lock = asyncio.Lock()
+
+
+def _get_claude_filter(use_batch_api: bool) -> ClaudeFilter:
+    """Return the shared ClaudeFilter for a mode, creating it on first use."""
+    if use_batch_api not in _claude_filters:
+        _claude_filters[use_batch_api] = ClaudeFilter(use_batch_api=use_batch_api)
+    return _claude_filters[use_batch_api]
+
+
+async def _start_log(now):
+    """Reset or create today's processing log for a new run.
+
+    Returns:
+        The processing log's id
+    """
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(ProcessingLog).where(ProcessingLog.run_date == now.date())
+        )
+        log = result.scalar_one_or_none()
+
+        if log:
+            # Update existing log
+            log.started_at = now
+            log.status = 'running'
+            log.feeds_processed = 0
+            log.items_fetched = 0
+            log.items_relevant = 0
+            log.items_priority_suggested = 0
+            log.api_calls_made = 0
+            log.error_message = None
+        else:
+            # Create new log entry
+            log = ProcessingLog(
+                run_date=now.date(),
+                started_at=now,
+                status='running',
+                feeds_processed=0,
+                items_fetched=0,
+                items_relevant=0,
+                items_priority_suggested=0,
+                api_calls_made=0
+            )
+            session.add(log)
+
+        await session.commit()
+        return log.id
+
+
+async def _bump_log(log_id, **fields):
+    """Update a processing log row in its own short transaction.
+
+    Keeps status and progress writes out of the run's insert transaction,
+    so they are visible while the run is in progress and survive its
+    rollback.
+    """
+    async with async_session_maker() as session:
+        await session.execute(
+            update(ProcessingLog).where(ProcessingLog.id == log_id).values(**fields)
+        )
+        await session.commit()
+
+
+async def _insert_items(session, rows):
+    """Bulk-insert feed item rows, skipping URLs that are already stored.
+
+    Returns:
+        Number of rows inserted
+    """
+    inserted = 0
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        stmt = (
+            dialect_insert(session, FeedItem)
+            .values(rows[start:start + INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=['url_hash'])
+            .returning(FeedItem.id)
+        )
+        result = await session.execute(stmt)
+        inserted += len(result.all())
+    return inserted
+
+
+async def _save_results(feeds, new_items, validators, now):
+    """Save a run's relevant items and its feeds' fetch state in one transaction.
+
+    Feeds are updated by id (last_fetched, plus the ETag / Last-Modified in
+    ``validators``), so a feed deleted while the run was in progress matches
+    no row, and its items are dropped rather than failing the insert and
+    losing every other feed's items with it. Keeping both in one
+    transaction means a feed is never marked unchanged without its items.
+
+    Returns:
+        Number of items inserted
+    """
+    feed_ids = [feed_source.id for feed_source in feeds]
+    changed = [
+        {
+            'feed_id': feed_source.id,
+            'last_fetched': feed_source.last_fetched,
+            **validators.get(feed_source, {})
+        }
+        for feed_source in feeds
+        if feed_source in validators or feed_source.last_fetched == now
+    ]
+
+    async with async_session_maker() as session:
+        # Key-share locks keep the surviving feeds from being deleted before
+        # their items are inserted
+        result = await session.execute(
+            select(FeedSource.id)
+            .where(FeedSource.id.in_(feed_ids))
+            .with_for_update(read=True, key_share=True)
+        )
+        existing = set(result.scalars().all())
+
+        rows = [row for row in new_items.values() if row['source_feed_id'] in existing]
+        if len(rows) < len(new_items):
+            logger.warning(f"Dropped {len(new_items) - len(rows)} items of feeds deleted during the run")
+
+        # Grouped by the columns they set, one executemany per group
+        groups = {}
+        for params in changed:
+            groups.setdefault(tuple(params), []).append(params)
+        for group in groups.values():
+            await session.execute(
+                update(FeedSource.__table__).where(FeedSource.__table__.c.id == bindparam('feed_id')),
+                group
+            )
+
+        inserted = await _insert_items(session, rows)
+        await session.commit()
+
+    return inserted
+
+
+async def _stored_url_hashes(hashes):
+    """Return which of ``hashes`` belong to stored feed items.
+
+    Only the given hashes are looked up, in chunked IN queries on a
+    short-lived session, so the cost follows the items fetched rather than
+    the size of the table.
+    """
+    stored = set()
+    async with async_session_maker() as session:
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            result = await session.execute(
+                select(FeedItem.url_hash)
+                .where(FeedItem.url_hash.in_(hashes[start:start + LOOKUP_CHUNK_SIZE]))
+            )
+            stored.update(result.scalars().all())
+    return stored
+
+
+def _new_items(feed_source, items, seen, now):
+    """Drop a feed's fetched items that another feed already queued this run.
+
+    ``seen`` holds the url_hash of every item queued so far and is updated
+    in place, so an item syndicated by several feeds is filtered once. Also
+    stamps the feed's last_fetched with the run's timestamp.
+    """
+    feed_source.last_fetched = now
+
+    new = []
+    for item in items:
+        if item['url_hash'] not in seen:
+            seen.add(item['url_hash'])
+            new.append(item)
+    logger.info(f"✓ Fetched {feed_source.name}: {len(items)} items")
+    return new
+
+
+async def _filter_batch(claude_filter, batch, now):
+    """Filter a coalesced batch of (feed_source, item) pairs (Pass 1).
+
+    Items already stored are dropped first, with one lookup for the whole
+    batch. Relevant items are stamped processed_at with the run's timestamp.
+
+    Returns:
+        (rows, api_calls, failed_feeds): insert rows for the relevant items,
+        the number of Claude requests made, and the feed sources with items
+        that could not be filtered
+    """
+    stored = await _stored_url_hashes([item['url_hash'] for _, item in batch])
+    batch = [(feed_source, item) for feed_source, item in batch if item['url_hash'] not in stored]
+    if not batch:
+        return [], 0, set()
+
+    logger.info(f"Filtering {len(batch)} new items for relevance...")
+    # filter_relevance annotates the items in place and keeps their order,
+    # so results line up with the feed sources by position
+    result = await claude_filter.filter_relevance([item for _, item in batch])
+
+    rows = [
+        {
+            'url': item_data['url'],
+            'url_hash': item_data['url_hash'],
+            'title': item_data['title'],
+            'content': item_data.get('content', ''),
+            'summary': item_data.get('summary', ''),
+            'published_date': item_data.get('published_date'),
+            'source_feed_id': feed_source.id,
+            'is_relevant': True,
+            'processed_at': now
+        }
+        for (feed_source, _), item_data in zip(batch, result.items)
+        if item_data.get('is_relevant')
+    ]
+    failed_feeds = {
+        feed_source
+        for (feed_source, _), item_data in zip(batch, result.items)
+        if item_data.get('filter_failed')
+    }
+    return rows, result.api_calls, failed_feeds
+
+
+async def _process_feeds(fetcher, claude_filter, feeds, max_items, now, log_id):
+    """Fetch and filter feeds as a two-stage pipeline.
+
+    ``feeds`` (FeedSource rows) are fed through a bounded queue to fetch
+    workers (one per fetcher concurrency slot), which queue the fetched
+    items not already queued by another feed. A batcher coalesces queued
+    items across feeds into filter_relevance calls of
+    FILTER_BATCH_ITEMS, or whatever has arrived after FILTER_BATCH_MAX_WAIT,
+    so small feeds share Claude requests and Claude starts on the first
+    feeds while the rest are still downloading. When claude_filter uses the
+    Message Batches API, all items are instead filtered in one call once
+    every feed is fetched, as a single batch submission. Each filter call
+    first drops the items already stored (see _filter_batch). Progress so
+    far is written to the processing log ``log_id`` after each filtered
+    batch.
+
+    Returns:
+        (feeds_processed, items_fetched, new_items, api_calls, validators),
+        where new_items holds the insert rows for relevant items keyed by
+        url_hash, so an item syndicated by several feeds is only inserted
+        once, and validators maps each feed source whose new items were all
+        filtered to the ETag / Last-Modified values from its response
+    """
+    fetch_workers = fetcher.max_concurrency
+    feed_queue = asyncio.Queue(maxsize=2 * fetch_workers)
+    item_queue = asyncio.Queue()
+
+    feeds_processed = 0
+    items_fetched = 0
+    new_items = {}
+    api_calls = 0
+    validators = {}
+    failed_feeds = set()
+    seen = set()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FILTER_BATCHES)
+
+    async def read_feeds():
+        nonlocal feeds_processed
+        try:
+            for feed_source in feeds:
+                feeds_processed += 1
+                await feed_queue.put(feed_source)
+        finally:
+            # One sentinel per fetch worker, even if reading failed
+            for _ in range(fetch_workers):
+                await feed_queue.put(None)
+
+    async def fetch_one(feed_source):
+        nonlocal items_fetched
+        # fetch_feed logs failures and returns no items
+        result = await fetcher.fetch_feed(feed_source, max_items=max_items)
+        items_fetched += len(result.items)
+        if result.items:
+            for item in _new_items(feed_source, result.items, seen, now):
+                item_queue.put_nowait((feed_source, item))
+        if result.validators is not None:
+            validators[feed_source] = result.validators
+
+    async def fetch_worker():
+        while (feed_source := await feed_queue.get()) is not None:
+            # One feed failing or hanging skips that feed, not the run
+            try:
+                await asyncio.wait_for(fetch_one(feed_source), FEED_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Feed {feed_source.name} timed out after {FEED_TIMEOUT}s")
+            except Exception as e:
+                logger.warning(f"Feed {feed_source.name} failed: {e}")
+
+    async def filter_batch(batch):
+        nonlocal api_calls
+        async with semaphore:
+            try:
+                rows, batch_api_calls, batch_failed_feeds = await _filter_batch(claude_filter, batch, now)
+            except Exception as e:
+                logger.error(f"Failed to filter {len(batch)} items: {e}", exc_info=True)
+                failed_feeds.update(feed_source for feed_source, _ in batch)
+                return
+        api_calls += batch_api_calls
+        failed_feeds.update(batch_failed_feeds)
+        for row in rows:
+            new_items.setdefault(row['url_hash'], row)
+
+        # Progress heartbeat; a failed write shouldn't fail the run
+        try:
+            await _bump_log(
+                log_id,
+                feeds_processed=feeds_processed,
+                items_fetched=items_fetched,
+                api_calls_made=api_calls
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update processing log progress: {e}")
+
+    async def batcher():
+        loop = asyncio.get_running_loop()
+        coalesce = not claude_filter.use_batch_api
+        tasks = []
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(deadline - loop.time(), 0) if batch and coalesce else None
+            try:
+                entry = await asyncio.wait_for(item_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                entry = ()
+            if entry is None:
+                break
+            if entry:
+                if not batch:
+                    deadline = loop.time() + FILTER_BATCH_MAX_WAIT
+                batch.append(entry)
+            if coalesce and batch and (len(batch) >= FILTER_BATCH_ITEMS or not entry):
+                tasks.append(asyncio.create_task(filter_batch(batch)))
+                batch = []
+        if batch:
+            tasks.append(asyncio.create_task(filter_batch(batch)))
+        await asyncio.gather(*tasks)
+
+    batcher_task = asyncio.create_task(batcher())
+    try:
+        await asyncio.gather(read_feeds(), *(fetch_worker() for _ in range(fetch_workers)))
+    finally:
+        # Every feed has been queued; flush the last batch and wait for it
+        item_queue.put_nowait(None)
+        await batcher_task
+
+    # A feed whose items weren't all filtered keeps its old validators, so
+    # the next run fetches those items again instead of getting a 304
+    validators = {
+        feed_source: fields for feed_source, fields in validators.items()
+        if feed_source not in failed_feeds
+    }
+    return feeds_processed, items_fetched, new_items, api_calls, validators
+
+
 class ProcessingService:
     """Service for processing RSS feeds daily."""
 
     @staticmethod
-    async def run_daily_processing(limit_feeds: int = None, limit_items_per_feed: int = 10):
+    def is_running() -> bool:
+        """Whether a processing run is in progress."""
+        return _run_lock.locked()
+
+    @staticmethod
+    async def run_daily_processing(limit_feeds: int = None, limit_items_per_feed: int = DEFAULT_ITEMS_PER_FEED,
+                                   use_batch_api: bool = True):
         """
         Run daily feed processing job.
 
         Args:
             limit_feeds: Limit number of feeds to process (for testing)
             limit_items_per_feed: Limit items per feed (default: 10)
+            use_batch_api: Filter through the Message Batches API (half
+                price, but results can take minutes to hours); disable for
+                manual runs that should finish promptly
 
         This is the main entry point called by APScheduler.
         Processes all RSS feeds, filters with Claude, and generates output feeds.
+        Feeds' ETag / Last-Modified validators are only stored by full runs.
+        Skipped if another run is already in progress.
         """
+        if _run_lock.locked():
+            logger.warning("Feed processing is already running; skipping this run")
+            return
+
+        async with _run_lock:
+            await ProcessingService._process(limit_feeds, limit_items_per_feed, use_batch_api)
+
+    @staticmethod
+    async def _process(limit_feeds: Optional[int], limit_items_per_feed: int, use_batch_api: bool):
+        """Run feed processing; see run_daily_processing."""
+        now = datetime.now(timezone.utc)
         logger.info("=" * 70)
-        logger.info(f"Starting feed processing at {datetime.utcnow()}")
+        logger.info(f"Starting feed processing at {now}")
         logger.info("=" * 70)
 
-        async with async_session_maker() as session:
-            today = datetime.utcnow().date()
+        log_id = await _start_log(now)
 
-            # Get or create processing log entry for today
-            result = await session.execute(
-                select(ProcessingLog).where(ProcessingLog.run_date == today)
-            )
-            log = result.scalar_one_or_none()
-
-            if log:
-                # Update existing log
-                log.started_at = datetime.utcnow()
-                log.status = 'running'
-                log.feeds_processed = 0
-                log.items_fetched = 0
-                log.items_relevant = 0
-                log.items_priority_suggested = 0
-                log.api_calls_made = 0
-                log.error_message = None
-            else:
-                # Create new log entry
-                log = ProcessingLog(
-                    run_date=today,
-                    started_at=datetime.utcnow(),
-                    status='running',
-                    feeds_processed=0,
-                    items_fetched=0,
-                    items_relevant=0,
-                    items_priority_suggested=0,
-                    api_calls_made=0
+        try:
+            # Get enabled feeds
+            query = _ENABLED_FEEDS_STMT.limit(limit_feeds) if limit_feeds else _ENABLED_FEEDS_STMT
+
+            # Read up front in a short session rather than streamed, so no
+            # connection or transaction is held while feeds download
+            async with async_session_maker() as session:
+                feeds = (await session.scalars(query)).all()
+            logger.info(f"Processing {len(feeds)} feeds...")
+
+            # Shared Claude filter
+            claude_filter = _get_claude_filter(use_batch_api)
+
+            # Fetch and filter feeds concurrently over one HTTP session
+            # for the whole run; unchanged feeds answer the conditional
+            # GET with 304 and yield no items
+            async with create_session() as http_session, \
+                    FeedFetcher(session=http_session) as fetcher:
+                feeds_processed, total_items_fetched, new_items, api_calls, validators = await _process_feeds(
+                    fetcher, claude_filter, feeds, limit_items_per_feed, now, log_id
                 )
-                session.add(log)
 
-            await session.commit()
+            # A limited run leaves items unprocessed; storing its validators
+            # would let the next full run's 304 skip them for good
+            if limit_feeds is not None or limit_items_per_feed < DEFAULT_ITEMS_PER_FEED:
+                validators = {}
 
-            try:
-                # Get enabled feeds
-                query = select(FeedSource).where(FeedSource.enabled == True)
-                if limit_feeds:
-                    query = query.limit(limit_feeds)
-
-                result = await session.execute(query)
-                feeds = result.scalars().all()
-
-                logger.info(f"Processing {len(feeds)} feeds...")
-
-                # Initialize Claude filter
-                claude_filter = ClaudeFilter()
-
-                total_items_fetched = 0
-                total_items_relevant = 0
-                api_calls = 0
-
-                # Process each feed
-                for feed_source in feeds:
-                    logger.info(f"Processing feed: {feed_source.name}")
-
-                    # Fetch feed items
-                    items = await FeedFetcher.fetch_feed(
-                        feed_source.feed_url,
-                        max_items=limit_items_per_feed
-                    )
-                    total_items_fetched += len(items)
-
-                    if not items:
-                        continue
-
-                    # Filter for relevance with Claude (Pass 1)
-                    logger.info(f"Filtering {len(items)} items for relevance...")
-                    filtered_items = await claude_filter.filter_relevance(items)
-                    api_calls += (len(items) + 9) // 10  # Batch size of 10
-
-                    # Save relevant items to database
-                    for item_data in filtered_items:
-                        if not item_data.get('is_relevant'):
-                            continue
-
-                        # Check if item already exists
-                        result = await session.execute(
-                            select(FeedItem).where(FeedItem.url == item_data['url'])
-                        )
-                        existing = result.scalar_one_or_none()
-
-                        if not existing:
-                            # Create new feed item
-                            feed_item = FeedItem(
-                                url=item_data['url'],
-                                title=item_data['title'],
-                                content=item_data.get('content', ''),
-                                summary=item_data.get('summary', ''),
-                                published_date=item_data.get('published_date'),
-                                source_feed_id=feed_source.id,
-                                is_relevant=True,
-                                processed_at=datetime.utcnow()
-                            )
-                            session.add(feed_item)
-                            total_items_relevant += 1
-
-                    # Update feed last_fetched
-                    feed_source.last_fetched = datetime.utcnow()
-
-                    await session.commit()
-                    logger.info(f"✓ Processed {feed_source.name}")
-
-                # Update processing log
-                log.feeds_processed = len(feeds)
-                log.items_fetched = total_items_fetched
-                log.items_relevant = total_items_relevant
-                log.api_calls_made = api_calls
-                log.status = 'success'
-                log.completed_at = datetime.utcnow()
-                await session.commit()
-
-                logger.info("=" * 70)
-                logger.info(f"✓ Processing complete!")
-                logger.info(f"  Feeds processed: {len(feeds)}")
-                logger.info(f"  Items fetched: {total_items_fetched}")
-                logger.info(f"  Items relevant: {total_items_relevant}")
-                logger.info(f"  API calls made: {api_calls}")
-                logger.info("=" * 70)
+            # Save new relevant items (URLs already stored are skipped) and
+            # the feeds' new validators and last_fetched
+            total_items_relevant = await _save_results(feeds, new_items, validators, now)
 
-            except Exception as e:
-                logger.error(f"Processing failed: {e}", exc_info=True)
-                log.status = 'failed'
-                log.completed_at = datetime.utcnow()
-                await session.commit()
-                raise
+            # Update processing log
+            await _bump_log(
+                log_id,
+                feeds_processed=feeds_processed,
+                items_fetched=total_items_fetched,
+                items_relevant=total_items_relevant,
+                api_calls_made=api_calls,
+                status='success',
+                completed_at=datetime.now(timezone.utc)
+            )
+
+            # New items are in; cached RSS documents are now stale
+            invalidate_rss_cache()
+
+            logger.info("=" * 70)
+            logger.info(f"✓ Processing complete!")
+            logger.info(f"  Feeds processed: {feeds_processed}")
+            logger.info(f"  Items fetched: {total_items_fetched}")
+            logger.info(f"  Items relevant: {total_items_relevant}")
+            logger.info(f"  API calls made: {api_calls}")
+            logger.info("=" * 70)
+
+        except Exception as e:
+            logger.error(f"Processing failed: {e}", exc_info=True)
+            # Nothing from the run was committed; record the failure
+            await _bump_log(log_id, status='failed', completed_at=datetime.now(timezone.utc))
+            raise
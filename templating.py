@@ -0,0 +1,22 @@
+"""
+Shared Jinja2 templates for Eratosthenes routes.
+"""
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+# One Environment for every router, so each template is compiled once.
+# Compiled bytecode is kept on disk and survives restarts; templates are only
+# re-checked for changes in development. Without a directory argument Jinja
+# uses a per-user cache directory it creates with mode 0700 and checks the
+# ownership of, so other local users can't plant bytecode in it.
+templates = Jinja2Templates(directory="templates")
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+templates.env.auto_reload = os.getenv("ENVIRONMENT") == "development"
+
+
+def warm_templates():
+    """Compile every template up front so the first page views don't pay for it."""
+    for name in templates.env.list_templates():
+        templates.env.get_template(name)
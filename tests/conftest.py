@@ -1,10 +1,13 @@
 """
 Pytest configuration and fixtures for Eratosthenes tests.
 """
-import pytest
 import asyncio
+
+import pytest
+import pytest_asyncio
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app import app
 from models.database import Base
@@ -15,55 +18,62 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 
 @pytest.fixture(scope="session")
-def event_loop():
-    """Create an event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+def test_engine():
+    """Create one test database engine for the whole session.
+
+    StaticPool keeps the single in-memory database connection alive, so the
+    schema is only created once; db_clean empties the tables between tests.
+    """
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        echo=False,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
 
+    yield engine
 
-@pytest.fixture(scope="function")
-async def test_engine():
-    """Create a test database engine."""
-    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+    asyncio.run(engine.dispose())
 
-    # Create all tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
 
-    yield engine
+@pytest_asyncio.fixture(scope="function")
+async def db_clean(test_engine):
+    """Ensure the schema exists and delete every row after the test."""
+    # Create all tables (a no-op once they exist)
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
-    # Drop all tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+    yield test_engine
 
-    await engine.dispose()
+    async with test_engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
 
 
-@pytest.fixture(scope="function")
-async def db_session(test_engine):
+@pytest_asyncio.fixture(scope="function")
+async def db_session(db_clean):
     """Create a test database session."""
     async_session = async_sessionmaker(
-        test_engine, class_=AsyncSession, expire_on_commit=False
+        db_clean, class_=AsyncSession, expire_on_commit=False
     )
 
     async with async_session() as session:
         yield session
 
 
-@pytest.fixture(scope="function")
-async def client(test_engine):
+@pytest_asyncio.fixture(scope="function")
+async def client(db_clean, monkeypatch):
     """Create a test client."""
     from models import database
+    import routes.api, routes.dashboard, routes.feeds, routes.review
 
-    # Override the database session maker
-    original_session_maker = database.async_session_maker
-    database.async_session_maker = async_sessionmaker(
-        test_engine, class_=AsyncSession, expire_on_commit=False
+    # Override the database session maker, including in the route modules
+    # that import it by name
+    session_maker = async_sessionmaker(
+        db_clean, class_=AsyncSession, expire_on_commit=False
     )
+    for module in (database, routes.api, routes.dashboard, routes.feeds, routes.review):
+        monkeypatch.setattr(module, "async_session_maker", session_maker)
 
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
-
-    # Restore original session maker
-    database.async_session_maker = original_session_maker
@@ -0,0 +1,86 @@
+"""
+Tests for the JSON API endpoints.
+"""
+import pytest
+from httpx import AsyncClient
+import base64
+
+
+@pytest.fixture
+def auth_headers():
+    """Basic auth headers for eratosthenes:eratosthenes."""
+    credentials = base64.b64encode(b"eratosthenes:eratosthenes").decode()
+    return {"Authorization": f"Basic {credentials}"}
+
+
+@pytest.mark.asyncio
+async def test_process_feeds_runs_in_background(client: AsyncClient, auth_headers, monkeypatch):
+    """Test that manual processing is accepted and handed to a background task."""
+    from services.scheduler import ProcessingService
+
+    calls = []
+
+    async def fake_run_daily_processing(**kwargs):
+        calls.append(kwargs)
+
+    monkeypatch.setattr(ProcessingService, "run_daily_processing", fake_run_daily_processing)
+
+    response = await client.post("/api/process-feeds?limit_feeds=2&limit_items=3", headers=auth_headers)
+    assert response.status_code == 202
+
+    data = response.json()
+    assert data["status"] == "accepted"
+    assert calls == [{"limit_feeds": 2, "limit_items_per_feed": 3, "use_batch_api": False}]
+
+
+@pytest.mark.asyncio
+async def test_process_feeds_conflicts_with_running_run(client: AsyncClient, auth_headers, monkeypatch):
+    """Test that manual processing is refused while a run is in progress."""
+    from services.scheduler import ProcessingService
+
+    monkeypatch.setattr(ProcessingService, "is_running", staticmethod(lambda: True))
+
+    response = await client.post("/api/process-feeds", headers=auth_headers)
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_process_feeds_requires_auth(client: AsyncClient):
+    """Test that manual processing requires authentication."""
+    response = await client.post("/api/process-feeds")
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_stats_not_modified(client: AsyncClient, auth_headers):
+    """Test that /api/stats answers a matching If-None-Match with 304."""
+    from routes.api import _stats_cache
+
+    _stats_cache.clear()
+
+    response = await client.get("/api/stats", headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = await client.get("/api/stats", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    response = await client.get("/api/stats", headers={**auth_headers, "If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_import_feeds_skips_existing(client: AsyncClient, auth_headers):
+    """Test that re-importing the OPML file skips every feed already stored."""
+    response = await client.post("/api/import-feeds", headers=auth_headers)
+    assert response.status_code == 200
+    first = response.json()
+    assert first["imported"] == first["total"] > 0
+    assert first["skipped"] == 0
+
+    response = await client.post("/api/import-feeds", headers=auth_headers)
+    assert response.status_code == 200
+    second = response.json()
+    assert second["imported"] == 0
+    assert second["skipped"] == second["total"] == first["total"]
@@ -0,0 +1,63 @@
+"""
+Tests for handling Claude's relevance results.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from services.claude_filter import ClaudeFilter
+
+
+class StubMessages:
+    """Answers every request with a fixed list of record_relevance results."""
+
+    def __init__(self, results):
+        self.results = results
+
+    async def create(self, **params):
+        return SimpleNamespace(content=[SimpleNamespace(input={"results": self.results})])
+
+
+@pytest.fixture
+def claude_filter(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    return ClaudeFilter(use_batch_api=False)
+
+
+def make_items(count):
+    return [{"url": f"https://example.com/{n}", "title": f"Item {n}"} for n in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_short_results_fail_the_batch(claude_filter):
+    """Test that fewer results than items marks every item failed, uncached."""
+    claude_filter.client = SimpleNamespace(messages=StubMessages(
+        [{"is_relevant": True, "reasoning": "security"}]
+    ))
+    items = make_items(3)
+
+    result = await claude_filter.filter_relevance(items)
+
+    assert all(item["filter_failed"] for item in result.items)
+    assert not any(item["is_relevant"] for item in result.items)
+    assert len(claude_filter._decisions) == 0
+
+
+@pytest.mark.asyncio
+async def test_results_are_applied_and_cached(claude_filter):
+    """Test that one result per item is applied in order and cached."""
+    claude_filter.client = SimpleNamespace(messages=StubMessages([
+        {"is_relevant": True, "reasoning": "security"},
+        {"is_relevant": False, "reasoning": "marketing"},
+    ]))
+
+    result = await claude_filter.filter_relevance(make_items(2))
+
+    assert [item["is_relevant"] for item in result.items] == [True, False]
+    assert not any(item.get("filter_failed") for item in result.items)
+    assert result.api_calls == 1
+
+    # Answered from the decision cache without another request
+    cached = await claude_filter.filter_relevance(make_items(2))
+    assert [item["reasoning"] for item in cached.items] == ["security", "marketing"]
+    assert cached.api_calls == 0
@@ -0,0 +1,30 @@
+"""
+Tests for feed item URL normalization.
+"""
+import pytest
+
+from services.feed_fetcher import FeedFetcher
+
+
+@pytest.mark.parametrize("url, expected", [
+    # Tracking parameters are dropped
+    ("https://example.com/a?utm_source=rss&utm_medium=feed", "https://example.com/a"),
+    ("https://example.com/a?id=7&UTM_Campaign=x", "https://example.com/a?id=7"),
+    ("https://example.com/a?fbclid=abc&page=2", "https://example.com/a?page=2"),
+    ("https://example.com/a?gclid=1&mc_cid=2&mc_eid=3", "https://example.com/a"),
+    # Otherwise the query is left exactly as it was
+    ("https://example.com/a?q=a%20b&x=1", "https://example.com/a?q=a%20b&x=1"),
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?b=2&a=1"),
+    # Scheme and host are case-folded, the path is not
+    ("HTTPS://Example.COM/Path/To", "https://example.com/Path/To"),
+    # Fragments are kept; hash-routed sites identify articles by them
+    ("https://example.com/#/advisory/1", "https://example.com/#/advisory/1"),
+    ("https://example.com/#!/advisory/2", "https://example.com/#!/advisory/2"),
+    ("https://example.com/a?id=1&utm_source=x#top", "https://example.com/a?id=1#top"),
+    # Surrounding whitespace and empty URLs
+    ("  https://example.com/a  ", "https://example.com/a"),
+    ("", ""),
+])
+def test_normalize_url(url, expected):
+    """Test that cosmetic URL variants normalize to one form."""
+    assert FeedFetcher._normalize_url(url) == expected
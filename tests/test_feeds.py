@@ -0,0 +1,65 @@
+"""
+Tests for the public RSS feed endpoints.
+"""
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.fixture(autouse=True)
+def empty_rss_cache():
+    """Start each test without cached feeds."""
+    from services.rss_cache import invalidate_rss_cache
+
+    invalidate_rss_cache()
+    yield
+    invalidate_rss_cache()
+
+
+async def cached_feed(client: AsyncClient):
+    """Request the standard feed twice so the second answer comes from the cache."""
+    response = await client.get("/feeds/standard.xml")
+    assert response.status_code == 200
+
+    response = await client.get("/feeds/standard.xml")
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.asyncio
+async def test_feed_not_modified_by_etag(client: AsyncClient):
+    """Test that a matching If-None-Match gets 304."""
+    response = await cached_feed(client)
+    etag = response.headers["etag"]
+
+    response = await client.get("/feeds/standard.xml", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = await client.get("/feeds/standard.xml", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_feed_not_modified_since(client: AsyncClient):
+    """Test that If-Modified-Since at or after Last-Modified gets 304."""
+    response = await cached_feed(client)
+    last_modified = response.headers["last-modified"]
+
+    response = await client.get("/feeds/standard.xml", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    response = await client.get(
+        "/feeds/standard.xml", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_feed_if_none_match_takes_precedence(client: AsyncClient):
+    """Test that If-Modified-Since is ignored when If-None-Match doesn't match."""
+    response = await cached_feed(client)
+
+    response = await client.get("/feeds/standard.xml", headers={
+        "If-None-Match": '"stale"',
+        "If-Modified-Since": response.headers["last-modified"]
+    })
+    assert response.status_code == 200
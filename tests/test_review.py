@@ -0,0 +1,93 @@
+"""
+Tests for the priority review queue.
+"""
+import base64
+import html
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+
+from models.feed_item import FeedItem, url_hash
+
+
+@pytest.fixture
+def auth_headers():
+    """Basic auth headers for eratosthenes:eratosthenes."""
+    credentials = base64.b64encode(b"eratosthenes:eratosthenes").decode()
+    return {"Authorization": f"Basic {credentials}"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("decision", ["approve", "reject"])
+async def test_review_missing_item(client: AsyncClient, auth_headers, decision):
+    """Test that reviewing an unknown item returns 404."""
+    response = await client.post(f"/review/999/{decision}", headers=auth_headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_review_records_decision(client: AsyncClient, db_session, auth_headers):
+    """Test that approving a suggestion stores the decision."""
+    item = FeedItem(
+        url="https://example.com/a",
+        url_hash=url_hash("https://example.com/a"),
+        title="A",
+        published_date=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        is_priority_suggestion=True
+    )
+    db_session.add(item)
+    await db_session.commit()
+
+    response = await client.post(f"/review/{item.id}/approve", headers=auth_headers)
+    assert response.status_code == 200
+
+    await db_session.refresh(item)
+    assert item.priority_feedback is True
+    assert item.is_priority_approved is True
+
+
+@pytest.mark.asyncio
+async def test_review_queue_keyset_pages(client: AsyncClient, db_session, auth_headers):
+    """Test that following "Next page" visits every pending item exactly once."""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for n in range(25):
+        url = f"https://example.com/{n}"
+        db_session.add(FeedItem(
+            url=url,
+            url_hash=url_hash(url),
+            title=f"Item {n}",
+            # Pairs of items share a published date, so paging relies on id
+            published_date=start + timedelta(hours=n // 2),
+            is_priority_suggestion=True
+        ))
+    await db_session.commit()
+
+    seen = []
+    path = "/review?limit=10"
+    while path:
+        response = await client.get(path, headers=auth_headers)
+        assert response.status_code == 200
+        seen += [int(item_id) for item_id in re.findall(r'id="item-(\d+)"', response.text)]
+        next_link = re.search(r'href="(/review\?cursor=[^"]+)"', response.text)
+        path = html.unescape(next_link.group(1)) if next_link else None
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [0, -1, 101])
+async def test_review_queue_rejects_bad_limit(client: AsyncClient, auth_headers, limit):
+    """Test that out-of-range page sizes are rejected rather than failing."""
+    response = await client.get(f"/review?limit={limit}", headers=auth_headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_review_queue_empty(client: AsyncClient, auth_headers):
+    """Test that an empty queue renders without a next page link."""
+    response = await client.get("/review?limit=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert "cursor=" not in response.text
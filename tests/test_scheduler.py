@@ -0,0 +1,284 @@
+"""
+Tests for the fetch-and-filter pipeline of a processing run.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from services import scheduler
+from services.claude_filter import FilterResult
+from services.feed_fetcher import FetchResult
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# The real lookup, before the autouse fixture stubs it out
+stored_url_hashes = scheduler._stored_url_hashes
+
+
+class StubFeed:
+    """Stands in for a FeedSource row."""
+
+    def __init__(self, id, items=3):
+        self.id = id
+        self.name = f"Feed {id}"
+        self.items = items
+        self.last_fetched = None
+
+
+class StubFetcher:
+    """Returns ``feed.items`` items per feed, with a validator."""
+
+    max_concurrency = 4
+
+    async def fetch_feed(self, feed_source, max_items):
+        items = [
+            {'url': f"https://example.com/{feed_source.id}/{n}",
+             'url_hash': f"{feed_source.id}/{n}".encode(),
+             'title': f"Item {n}"}
+            for n in range(feed_source.items)
+        ]
+        return FetchResult(items, {'etag': f'"{feed_source.id}"', 'last_modified': None})
+
+
+class StubFilter:
+    """Marks every item relevant and records the size of each call."""
+
+    def __init__(self, use_batch_api=False):
+        self.use_batch_api = use_batch_api
+        self.calls = []
+
+    async def filter_relevance(self, items):
+        self.calls.append(len(items))
+        for item in items:
+            item['is_relevant'] = True
+        return FilterResult(items, 1)
+
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    """Skip the processing log heartbeat and treat nothing as stored."""
+    async def bump_log(log_id, **fields):
+        pass
+
+    async def stored_url_hashes(hashes):
+        return set()
+
+    monkeypatch.setattr(scheduler, "_bump_log", bump_log)
+    monkeypatch.setattr(scheduler, "_stored_url_hashes", stored_url_hashes)
+
+
+async def process(fetcher, claude_filter, feeds):
+    return await scheduler._process_feeds(fetcher, claude_filter, feeds, 10, NOW, 1)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_coalesces_items_across_feeds():
+    """Test that small feeds share filter calls of at most FILTER_BATCH_ITEMS."""
+    feeds = [StubFeed(n) for n in range(50)]
+    claude_filter = StubFilter()
+
+    feeds_processed, items_fetched, new_items, api_calls, validators = await process(
+        StubFetcher(), claude_filter, feeds
+    )
+
+    assert feeds_processed == 50
+    assert items_fetched == 150
+    assert len(new_items) == 150
+    assert sum(claude_filter.calls) == 150
+    assert max(claude_filter.calls) <= scheduler.FILTER_BATCH_ITEMS
+    assert len(claude_filter.calls) < len(feeds)
+    assert api_calls == len(claude_filter.calls)
+    assert set(validators) == set(feeds)
+    assert all(feed.last_fetched == NOW for feed in feeds)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batch_api_filters_once():
+    """Test that the Message Batches API path makes a single filter call."""
+    claude_filter = StubFilter(use_batch_api=True)
+
+    await process(StubFetcher(), claude_filter, [StubFeed(n, items=20) for n in range(10)])
+
+    assert claude_filter.calls == [200]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_stored_items(monkeypatch):
+    """Test that items already stored are not sent to the filter."""
+    lookups = []
+
+    async def stored_url_hashes(hashes):
+        lookups.append(sorted(hashes))
+        return {b"1/0", b"1/2"} & set(hashes)
+
+    monkeypatch.setattr(scheduler, "_stored_url_hashes", stored_url_hashes)
+    claude_filter = StubFilter()
+
+    _, items_fetched, new_items, _, _ = await process(StubFetcher(), claude_filter, [StubFeed(1)])
+
+    assert items_fetched == 3
+    assert [row['url_hash'] for row in new_items.values()] == [b"1/1"]
+    assert claude_filter.calls == [1]
+    # Only the fetched items are looked up, once for the batch
+    assert lookups == [[b"1/0", b"1/1", b"1/2"]]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_filters_syndicated_items_once():
+    """Test that an item fetched from several feeds is filtered once."""
+    class SyndicatingFetcher(StubFetcher):
+        async def fetch_feed(self, feed_source, max_items):
+            result = await super().fetch_feed(feed_source, max_items)
+            for item in result.items:
+                item['url_hash'] = item['url_hash'].split(b"/")[1]
+            return result
+
+    claude_filter = StubFilter()
+
+    _, items_fetched, new_items, _, _ = await process(
+        SyndicatingFetcher(), claude_filter, [StubFeed(1), StubFeed(2)]
+    )
+
+    assert items_fetched == 6
+    assert len(new_items) == 3
+    assert sum(claude_filter.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_stored_url_hashes_looks_up_given_hashes(db_clean, monkeypatch):
+    """Test the chunked lookup of stored items against the database."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from models.feed_item import FeedItem, url_hash
+
+    session_maker = async_sessionmaker(db_clean, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler, "async_session_maker", session_maker)
+    monkeypatch.setattr(scheduler, "LOOKUP_CHUNK_SIZE", 2)
+
+    urls = [f"https://example.com/{n}" for n in range(5)]
+    async with session_maker() as session:
+        for url in urls[:3]:
+            session.add(FeedItem(url=url, url_hash=url_hash(url), title="Item"))
+        await session.commit()
+
+    stored = await stored_url_hashes([url_hash(url) for url in urls[1:]])
+
+    assert stored == {url_hash(urls[1]), url_hash(urls[2])}
+
+
+class SlowFetcher(StubFetcher):
+    """Hangs on feed 0 and fails on feed 1."""
+
+    async def fetch_feed(self, feed_source, max_items):
+        if feed_source.id == 0:
+            await asyncio.sleep(60)
+        if feed_source.id == 1:
+            return FetchResult([{'url': 'https://example.com/broken'}])
+        return await super().fetch_feed(feed_source, max_items)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_slow_and_failing_feeds(monkeypatch):
+    """Test that a hanging or failing feed is skipped without stalling the run."""
+    monkeypatch.setattr(scheduler, "FEED_TIMEOUT", 0.1)
+    feeds = [StubFeed(n) for n in range(4)]
+
+    feeds_processed, _, new_items, _, validators = await asyncio.wait_for(
+        process(SlowFetcher(), StubFilter(), feeds), 5
+    )
+
+    assert feeds_processed == 4
+    assert len(new_items) == 6
+    assert set(validators) == {feeds[2], feeds[3]}
+
+
+class FailingFilter(StubFilter):
+    """Raises for any batch containing an item from feed 0."""
+
+    async def filter_relevance(self, items):
+        if any(item['url_hash'].startswith(b"0/") for item in items):
+            raise RuntimeError("Claude unavailable")
+        return await super().filter_relevance(items)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_filter_failure_keeps_validators_unstored(monkeypatch):
+    """Test that feeds whose items weren't filtered get no new validators."""
+    # One feed per batch, so only feed 0's batch fails
+    monkeypatch.setattr(scheduler, "FILTER_BATCH_ITEMS", 3)
+    fetcher = StubFetcher()
+    fetcher.max_concurrency = 1
+    feeds = [StubFeed(0), StubFeed(1)]
+
+    _, _, new_items, _, validators = await process(fetcher, FailingFilter(), feeds)
+
+    assert sorted(row['source_feed_id'] for row in new_items.values()) == [1, 1, 1]
+    assert set(validators) == {feeds[1]}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_failed_items_keep_validators_unstored():
+    """Test that items marked filter_failed withhold their feed's validators."""
+    class PartlyFailingFilter(StubFilter):
+        async def filter_relevance(self, items):
+            result = await super().filter_relevance(items)
+            for item in items:
+                if item['url_hash'] == b"0/1":
+                    item['is_relevant'] = False
+                    item['filter_failed'] = True
+            return result
+
+    feeds = [StubFeed(0), StubFeed(1)]
+
+    _, _, new_items, _, validators = await process(StubFetcher(), PartlyFailingFilter(), feeds)
+
+    assert len(new_items) == 5
+    assert set(validators) == {feeds[1]}
+
+
+@pytest.mark.asyncio
+async def test_save_results_survives_feed_deleted_mid_run(db_clean, monkeypatch):
+    """Test that a feed deleted during the run only loses its own items."""
+    from sqlalchemy import delete, select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from models.feed_item import FeedItem, url_hash
+    from models.feed_source import FeedSource
+
+    session_maker = async_sessionmaker(db_clean, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler, "async_session_maker", session_maker)
+
+    async with session_maker() as session:
+        kept = FeedSource(feed_url="https://example.com/kept.xml", name="Kept")
+        deleted = FeedSource(feed_url="https://example.com/deleted.xml", name="Deleted")
+        session.add_all([kept, deleted])
+        await session.commit()
+
+    # The run holds detached rows; one feed is deleted before the final write
+    async with session_maker() as session:
+        await session.execute(delete(FeedSource).where(FeedSource.id == deleted.id))
+        await session.commit()
+
+    new_items = {}
+    for feed_source in (kept, deleted):
+        feed_source.last_fetched = NOW
+        url = f"https://example.com/{feed_source.id}/item"
+        new_items[url_hash(url)] = {
+            'url': url, 'url_hash': url_hash(url), 'title': 'Item',
+            'source_feed_id': feed_source.id, 'is_relevant': True, 'processed_at': NOW
+        }
+    validators = {
+        feed_source: {'etag': f'"{feed_source.id}"', 'last_modified': None}
+        for feed_source in (kept, deleted)
+    }
+
+    inserted = await scheduler._save_results([kept, deleted], new_items, validators, NOW)
+
+    assert inserted == 1
+    async with session_maker() as session:
+        items = (await session.scalars(select(FeedItem))).all()
+        assert [item.source_feed_id for item in items] == [kept.id]
+        feeds = (await session.scalars(select(FeedSource))).all()
+        assert [(feed.id, feed.etag) for feed in feeds] == [(kept.id, f'"{kept.id}"')]
+        assert feeds[0].last_fetched is not None